@@ -1,11 +1,56 @@
 """Excel Migration Framework."""
+import importlib
+
 from .core.interfaces import *
 from .core.models import *
 from .core.processor import *
-from .llm.agents import *
-from .llm.chain import *
-from .rules.engine import *
 from .tasks.base import *
-from .vision.processor import *
 
-__version__ = "0.1.0"
\ No newline at end of file
+# The LLM chain's provider takes precedence over the core interface, as it did
+# when every module was star-imported here; it is resolved lazily below.
+del LLMProvider
+
+__version__ = "0.1.0"
+
+# Names from modules that pull in LLM SDKs or vision models (torch, opencv,
+# transformers), mapped to the module that defines them. Each module is only
+# imported when one of its names is first accessed.
+_LAZY_NAMES = {
+    "PlanStep": ".llm.agents",
+    "CoordinationPlan": ".llm.agents",
+    "ExcelTools": ".llm.agents",
+    "ExcelAgent": ".llm.agents",
+    "MultiAgentSystem": ".llm.agents",
+    "AgentFactory": ".llm.agents",
+    "LLMProvider": ".llm.chain",
+    "ChainManager": ".llm.chain",
+    "ExcelProcessor": ".llm.chain",
+    "ProcessingCallback": ".llm.chain",
+    "RuleEngine": ".rules.engine",
+    "SheetImageProcessor": ".vision.processor",
+}
+
+__all__ = [
+    # core.interfaces
+    "Task", "RuleGenerator", "SheetAnalyzer", "DataExtractor", "TaskHandler",
+    "TaskProcessor", "RuleExecutor", "ImageProcessor", "Logger", "ConfigProvider",
+    "CacheProvider", "EventEmitter", "MetricsCollector",
+    # core.models
+    "CellType", "RuleType", "Cell", "MigrationRule", "ValidationResult",
+    "MigrationContext",
+    # core.processor
+    "ExcelMigrationProcessor",
+    # tasks.base
+    "SheetMapping", "MigrationTask", "TaskRegistry", "BaseTaskHandler",
+    "TaskBasedProcessor",
+    *_LAZY_NAMES,
+]
+
+def __getattr__(name):
+    """Import the submodule that defines a lazily exported name on first access."""
+    module_name = _LAZY_NAMES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -1,21 +1,38 @@
 """Command-line interface for Excel migration framework."""
 import argparse
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import sys
+import json
 import asyncio
 from loguru import logger
 
-from .tasks.base import MigrationTask, TaskRegistry, TaskBasedProcessor
-from .core.interfaces import RuleGenerator, SheetAnalyzer
-from .llm.agents import MultiAgentSystem
-from .vision.processor import SheetImageProcessor
+try:
+    import uvloop
+    _HAS_UVLOOP = True
+except ImportError:
+    _HAS_UVLOOP = False
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
+from .tasks.base import MigrationTask, SheetMapping, TaskRegistry, TaskBasedProcessor
+from .core.interfaces import RuleGenerator
+from .core.analyzers import ExcelSheetAnalyzer
 
 def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None):
     """Configure logging with loguru."""
     # Remove default handler
     logger.remove()
     
+    # Sinks are written from a background thread (enqueue=True) so bursts of
+    # log calls don't block processing; if the process crashes, the last
+    # in-flight messages may be lost, which is acceptable for a batch CLI.
+    # Debug output stays synchronous so it is emitted in order with failures.
+    
     # Add console handler with custom format
     logger.add(
         sys.stderr,
@@ -23,7 +40,8 @@ def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None):
                "<level>{level: <8}</level> | "
                "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | "
                "<level>{message}</level>",
-        level=log_level
+        level=log_level,
+        enqueue=log_level != "DEBUG"
     )
     
     # Add file handler if specified
@@ -33,8 +51,34 @@ def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None):
             rotation="10 MB",
             retention="1 week",
             compression="zip",
-            level=log_level
+            level=log_level,
+            enqueue=True,
+            buffering=8192
+        )
+
+def _load_json(path: Path) -> Any:
+    """Load a JSON file, using orjson when it is installed."""
+    data = path.read_bytes()
+    if _HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _load_rules(path: Path) -> List[Dict[str, Any]]:
+    """Load static rules from a file holding a list of rules or {"rules": [...]}."""
+    data = _load_json(path)
+    rules = data.get("rules", []) if isinstance(data, dict) else data
+    if not isinstance(rules, list):
+        raise ValueError(f"Rules file must contain a list of rules: {path}")
+    return rules
+
+def _kv(value: str) -> Tuple[str, str]:
+    """Parse a 'screenshot.png:SheetName' mapping argument."""
+    key, _, val = value.partition(":")
+    if not key or not val:
+        raise argparse.ArgumentTypeError(
+            f"Invalid screenshot mapping '{value}'. Use 'screenshot.png:SheetName'"
         )
+    return key, val
 
 def parse_args() -> argparse.Namespace:
     """Parse command line arguments."""
@@ -112,6 +156,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--screenshot-sheet-mapping",
         nargs="+",
+        type=_kv,
         help="Mapping of screenshots to sheet names (format: screenshot.png:SheetName)"
     )
     
@@ -183,29 +228,40 @@ def parse_args() -> argparse.Namespace:
         if len(args.example_source_sheets) != len(args.example_target_sheets):
             parser.error("Number of example source and target sheets must match")
     
-    if args.screenshot_sheet_mapping:
-        try:
-            screenshot_mappings = [mapping.split(":") for mapping in args.screenshot_sheet_mapping]
-            args.screenshot_map = {screenshot: sheet for screenshot, sheet in screenshot_mappings}
-        except ValueError:
-            parser.error("Invalid screenshot mapping format. Use 'screenshot.png:SheetName'")
+    args.screenshot_map = dict(args.screenshot_sheet_mapping or [])
     
     return args
 
 async def run_task(args: argparse.Namespace) -> bool:
     """Run a migration task with the provided arguments."""
     try:
-        # Set up components
-        image_processor = SheetImageProcessor()
-        llm_system = MultiAgentSystem(
-            provider=args.llm_provider,
-            model=args.model
-        )
+        # Set up components; LLM and vision stacks are imported only when used
+        image_processor = None
+        if args.screenshots or args.screenshot_sheet_mapping:
+            from .vision.processor import SheetImageProcessor
+            image_processor = SheetImageProcessor()
+        
+        # Static rules from --rules are applied to every mapped sheet
+        static_rules = _load_rules(args.rules) if args.rules else None
+        
+        # Static rules need no LLM-driven generation or analysis; a missing or
+        # empty rules file falls back to the LLM pipeline
+        llm_system = None
+        rule_generator = None
+        sheet_analyzer = None
+        if not static_rules:
+            from .llm.agents import MultiAgentSystem
+            llm_system = MultiAgentSystem(
+                provider=args.llm_provider,
+                model=args.model
+            )
+            rule_generator = RuleGenerator()
+            sheet_analyzer = ExcelSheetAnalyzer(image_processor)
         
         # Create task processor
         processor = TaskBasedProcessor(
-            rule_generator=RuleGenerator(),
-            sheet_analyzer=SheetAnalyzer(image_processor),
+            rule_generator=rule_generator,
+            sheet_analyzer=sheet_analyzer,
             llm_provider=llm_system
         )
         
@@ -217,10 +273,21 @@ async def run_task(args: argparse.Namespace) -> bool:
         if args.source_sheets and args.target_sheets:
             sheet_mapping = dict(zip(args.source_sheets, args.target_sheets))
         
+        sheet_mappings = [
+            SheetMapping(source_sheet, target_sheet, rules=static_rules)
+            for source_sheet, target_sheet in sheet_mapping.items()
+        ]
+        
         example_sheet_mapping = {}
         if args.example_source_sheets and args.example_target_sheets:
             example_sheet_mapping = dict(zip(args.example_source_sheets, args.example_target_sheets))
         
+        # Rules attached to the mappings are run by the processor's rule executor
+        rule_executor = None
+        if static_rules:
+            from .rules.executor import RuleExecutor
+            rule_executor = RuleExecutor()
+        
         # Create task
         task = MigrationTask(
             source_file=args.source,
@@ -233,8 +300,10 @@ async def run_task(args: argparse.Namespace) -> bool:
                 "debug": args.debug,
                 "sheet_mapping": sheet_mapping,
                 "example_sheet_mapping": example_sheet_mapping,
-                "screenshot_mapping": getattr(args, "screenshot_map", {})
+                "screenshot_mapping": args.screenshot_map,
+                "rule_executor": rule_executor
             },
+            sheet_mappings=sheet_mappings,
             example_source=args.example_source,
             example_target=args.example_target,
             screenshots=args.screenshots
@@ -246,6 +315,14 @@ async def run_task(args: argparse.Namespace) -> bool:
             logger.error(f"No handler found for task type: {args.task_type}")
             return False
         
+        # Analyze all mapped source sheets concurrently up front
+        if sheet_analyzer and len(sheet_mapping) > 1:
+            analyses = await asyncio.gather(*[
+                sheet_analyzer.analyze_sheet(args.source, sheet)
+                for sheet in sheet_mapping
+            ])
+            task.context["sheet_analyses"] = dict(zip(sheet_mapping, analyses))
+        
         # Execute task
         success = await handler.handle(task)
         
@@ -268,9 +345,11 @@ def main():
     setup_logging(args.log_level, args.log_file)
     
     if args.debug:
-        logger.debug("Arguments: {}", vars(args))
+        logger.opt(lazy=True).debug("Arguments: {}", lambda: vars(args))
     
-    # Run task
+    # Run task, on uvloop's faster event loop when installed
+    if _HAS_UVLOOP:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     success = asyncio.run(run_task(args))
     
     # Exit with appropriate code
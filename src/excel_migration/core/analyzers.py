@@ -1,26 +1,62 @@
 """Concrete implementations of analyzer interfaces."""
+import asyncio
+import os
+import weakref
+import zipfile
 from pathlib import Path
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+from xml.etree import ElementTree
 import openpyxl
+from openpyxl.formula.translate import Translator
+from openpyxl.utils import get_column_letter
 from loguru import logger
 
+try:
+    from python_calamine import CalamineWorkbook
+    _HAS_CALAMINE = True
+except ImportError:
+    _HAS_CALAMINE = False
+
+# XML namespaces used by the xlsx package parts read in _iter_formulas
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_DOC_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
 from .interfaces import SheetAnalyzer
-from ..vision.processor import SheetImageProcessor
+
+if TYPE_CHECKING:
+    # Importing the vision stack loads torch/opencv; only needed for annotations
+    from ..vision.processor import SheetImageProcessor
 
 class ExcelSheetAnalyzer(SheetAnalyzer):
     """Concrete implementation of sheet analyzer."""
     
-    def __init__(self, image_processor: SheetImageProcessor):
+    def __init__(self, image_processor: Optional["SheetImageProcessor"],
+                 max_concurrency: Optional[int] = None):
         self.image_processor = image_processor
+        # Bound concurrent workbook parses to avoid exhausting file descriptors.
+        # A semaphore belongs to the event loop that first uses it, so one is
+        # created per loop, letting the analyzer be reused across asyncio.run calls.
+        self.max_concurrency = max_concurrency or min(8, os.cpu_count() or 1)
+        self._sems = weakref.WeakKeyDictionary()  # event loop -> semaphore
         logger.debug("Initialized Excel sheet analyzer")
 
     async def analyze_sheet(self, sheet_path: Path, sheet_name: str) -> Dict[str, Any]:
         """Analyze a sheet and return its structure and content."""
+        loop = asyncio.get_running_loop()
+        sem = self._sems.get(loop)
+        if sem is None:
+            sem = self._sems[loop] = asyncio.Semaphore(self.max_concurrency)
+        async with sem:
+            return await asyncio.to_thread(self._analyze_sheet_sync, sheet_path, sheet_name)
+
+    def _analyze_sheet_sync(self, sheet_path: Path, sheet_name: str) -> Dict[str, Any]:
+        """Blocking sheet analysis, run in a worker thread by analyze_sheet."""
         try:
             # First pass with read_only for basic data
             analysis = self._analyze_data(sheet_path, sheet_name)
             
-            # Second pass without read_only for formulas
+            # Second pass streaming the worksheet XML for formulas
             analysis.update(self._analyze_formulas(sheet_path, sheet_name))
             
             return analysis
@@ -30,76 +66,148 @@ class ExcelSheetAnalyzer(SheetAnalyzer):
             raise
 
     def _analyze_data(self, sheet_path: Path, sheet_name: str) -> Dict[str, Any]:
-        """Analyze sheet data using read_only mode."""
-        wb = openpyxl.load_workbook(sheet_path, read_only=True)
-        ws = wb[sheet_name]
+        """Analyze sheet data from the header row and a small row sample."""
+        if _HAS_CALAMINE:
+            max_row, max_column, rows = self._read_sample_calamine(sheet_path, sheet_name)
+        else:
+            max_row, max_column, rows = self._read_sample_openpyxl(sheet_path, sheet_name)
         
         analysis = {
             "sheet_name": sheet_name,
-            "max_row": ws.max_row,
-            "max_column": ws.max_column,
+            "max_row": max_row,
+            "max_column": max_column,
             "headers": [],
             "data_sample": [],
             "column_types": {}
         }
         
-        # Get headers (first row)
-        for cell in ws[1]:
-            if cell.value:
-                analysis["headers"].append(str(cell.value))
+        header_row = rows[0] if rows else ()
+        data_rows = rows[1:]
+        analysis["headers"] = [str(value) for value in header_row if value]
         
         # Sample some data rows
-        sample_size = min(5, ws.max_row - 1)  # Sample up to 5 rows
-        for row in list(ws.rows)[1:sample_size+1]:  # Skip header row
-            row_data = []
-            for cell in row:
-                if cell.value:
-                    row_data.append(str(cell.value))
-                else:
-                    row_data.append("")
-            analysis["data_sample"].append(row_data)
+        analysis["data_sample"] = [
+            [str(value) if value else "" for value in row]
+            for row in data_rows
+        ]
         
-        # Analyze column types
-        for col in range(1, ws.max_column + 1):
-            col_letter = openpyxl.utils.get_column_letter(col)
-            values = []
-            for row in range(2, min(7, ws.max_row + 1)):  # Sample first 5 data rows
-                cell = ws[f"{col_letter}{row}"]
-                if cell.value:
-                    values.append(type(cell.value).__name__)
-            
-            # Determine most common type
-            if values:
-                from collections import Counter
-                type_counts = Counter(values)
-                most_common_type = type_counts.most_common(1)[0][0]
-                analysis["column_types"][col_letter] = most_common_type
+        # Analyze column types from the sampled rows, one column at a time
+        for col, col_values in enumerate(zip(*data_rows), start=1):
+            most_common_type = self._mode_type(col_values)
+            if most_common_type:
+                analysis["column_types"][get_column_letter(col)] = most_common_type
         
-        wb.close()
         return analysis
 
-    def _analyze_formulas(self, sheet_path: Path, sheet_name: str) -> Dict[str, Any]:
-        """Analyze sheet formulas without read_only mode."""
+    def _read_sample_openpyxl(self, sheet_path: Path,
+                              sheet_name: str) -> Tuple[int, int, List[Sequence[Any]]]:
+        """Read the header row plus up to 5 data rows using read_only mode."""
+        wb = openpyxl.load_workbook(sheet_path, read_only=True)
         try:
-            wb = openpyxl.load_workbook(sheet_path, data_only=False)
             ws = wb[sheet_name]
-            
-            formulas = []
-            # Only check first 100 rows to avoid performance issues
-            max_rows = min(100, ws.max_row)
-            
-            for row in range(1, max_rows + 1):
-                for col in range(1, ws.max_column + 1):
-                    cell = ws.cell(row=row, column=col)
-                    if hasattr(cell, 'value') and cell.value and str(cell.value).startswith('='):
-                        formulas.append({
-                            "cell": f"{openpyxl.utils.get_column_letter(col)}{row}",
-                            "formula": str(cell.value)[1:]  # Remove the '=' prefix
-                        })
-            
+            rows = list(ws.iter_rows(min_row=1, max_row=min(6, ws.max_row), values_only=True))
+            return ws.max_row, ws.max_column, rows
+        finally:
             wb.close()
+
+    def _read_sample_calamine(self, sheet_path: Path,
+                              sheet_name: str) -> Tuple[int, int, List[Sequence[Any]]]:
+        """Read the header row plus up to 5 data rows with the calamine parser.
+        
+        Calamine returns cached values, so formula cells show their last computed
+        result rather than the formula text; formulas are read by _analyze_formulas.
+        """
+        sheet = CalamineWorkbook.from_path(str(sheet_path)).get_sheet_by_name(sheet_name)
+        max_row, max_column = (sheet.end[0] + 1, sheet.end[1] + 1) if sheet.end else (0, 0)
+        
+        # Calamine yields every number as a float; match openpyxl's int for whole numbers
+        rows = [
+            [int(value) if isinstance(value, float) and value.is_integer() else value
+             for value in row]
+            for row in sheet.to_python(skip_empty_area=False, nrows=6)
+        ]
+        return max_row, max_column, rows
+
+    def _mode_type(self, values: Iterable[Any]) -> Optional[str]:
+        """Return the most common type name among the non-empty values."""
+        counts = {}
+        most_common_type, most_common_count = None, 0
+        for value in values:
+            if not value:
+                continue
+            type_name = type(value).__name__
+            count = counts[type_name] = counts.get(type_name, 0) + 1
+            if count > most_common_count:
+                most_common_type, most_common_count = type_name, count
+        return most_common_type
+
+    def _analyze_formulas(self, sheet_path: Path, sheet_name: str) -> Dict[str, Any]:
+        """Analyze sheet formulas by streaming the worksheet XML."""
+        try:
+            # Only check first 100 rows to avoid performance issues
+            formulas = [
+                {"cell": ref, "formula": formula}
+                for ref, formula in self._iter_formulas(sheet_path, sheet_name, max_rows=100)
+            ]
             return {"formulas": formulas}
             
         except Exception as e:
             logger.warning(f"Could not analyze formulas in {sheet_name}: {str(e)}")
-            return {"formulas": []}  # Return empty formulas on error
\ No newline at end of file
+            return {"formulas": []}  # Return empty formulas on error
+
+    def _iter_formulas(self, sheet_path: Path, sheet_name: str,
+                       max_rows: int) -> Iterator[Tuple[str, str]]:
+        """Yield (cell, formula) pairs without building the openpyxl object model."""
+        with zipfile.ZipFile(sheet_path) as archive:
+            sheet_xml = self._resolve_sheet_xml(archive, sheet_name)
+            shared = {}  # shared formula index -> (master formula, master cell)
+            row_idx = 0
+            
+            with archive.open(sheet_xml) as stream:
+                for _, elem in ElementTree.iterparse(stream):
+                    if elem.tag != _MAIN_NS + "row":
+                        continue
+                    
+                    row_idx = int(elem.get("r", row_idx + 1))
+                    if row_idx > max_rows:
+                        break
+                    
+                    for col_idx, cell in enumerate(elem.iter(_MAIN_NS + "c"), start=1):
+                        formula = cell.find(_MAIN_NS + "f")
+                        if formula is None:
+                            continue
+                        
+                        ref = cell.get("r") or f"{get_column_letter(col_idx)}{row_idx}"
+                        text = formula.text
+                        if formula.get("t") == "shared":
+                            index = formula.get("si")
+                            if text:
+                                shared[index] = (text, ref)
+                            elif index in shared:
+                                master_text, master_ref = shared[index]
+                                translator = Translator(f"={master_text}", origin=master_ref)
+                                text = translator.translate_formula(ref)[1:]
+                        
+                        if text:
+                            yield ref, text
+                    
+                    # Drop parsed cells so memory stays bounded by one row
+                    elem.clear()
+
+    def _resolve_sheet_xml(self, archive: zipfile.ZipFile, sheet_name: str) -> str:
+        """Find the package path of a worksheet from the workbook relationships."""
+        workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+        for sheet in workbook.iter(_MAIN_NS + "sheet"):
+            if sheet.get("name") == sheet_name:
+                rel_id = sheet.get(_DOC_REL_NS + "id")
+                break
+        else:
+            raise KeyError(f"Worksheet {sheet_name} does not exist.")
+        
+        rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+        for rel in rels.iter(_PKG_REL_NS + "Relationship"):
+            if rel.get("Id") == rel_id:
+                target = rel.get("Target")
+                return target[1:] if target.startswith("/") else f"xl/{target}"
+        
+        raise KeyError(f"No relationship found for worksheet {sheet_name}")
@@ -0,0 +1,65 @@
+"""Restricted compilation of rule and formula expressions."""
+import ast
+from types import CodeType
+from typing import Any, Iterable
+
+def _avg(values: Iterable[Any]) -> float:
+    """Average of the non-empty values."""
+    present = [value for value in values if value is not None]
+    return sum(present) / len(present)
+
+def _count(values: Iterable[Any]) -> int:
+    """Number of non-empty values."""
+    return sum(1 for value in values if value is not None)
+
+# Globals for evaluating compiled expressions; shared, never mutated.
+# Only a few side-effect-free builtins and helpers are available.
+EXPRESSION_GLOBALS = {
+    "__builtins__": {},
+    "sum": sum, "len": len, "float": float, "int": int,
+    "min": min, "max": max, "round": round, "abs": abs,
+    "avg": _avg, "count": _count
+}
+
+# Expression nodes allowed in expressions. Attribute access, lambdas,
+# comprehensions and assignment expressions are not among them.
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Call, ast.Name, ast.Load, ast.Constant, ast.keyword,
+    ast.List, ast.Tuple, ast.Subscript, ast.Slice,
+    ast.operator, ast.unaryop, ast.boolop, ast.cmpop
+)
+
+def _is_dunder(value: object) -> bool:
+    """Check if a name or subscript key is a dunder like ``__class__``."""
+    return isinstance(value, str) and value.startswith("__")
+
+def compile_expression(source: str, filename: str) -> CodeType:
+    """Compile an expression after checking it against a whitelist.
+    
+    Rule and formula expressions come from user-supplied files, and an empty
+    ``__builtins__`` alone does not stop them from reaching arbitrary objects
+    (e.g. through ``().__class__``). Only arithmetic, comparisons, conditionals,
+    list and tuple literals, indexing and calls to the functions in
+    EXPRESSION_GLOBALS are accepted; dunder names and keys are rejected.
+    
+    Raises SyntaxError if the source doesn't parse and ValueError if it uses
+    anything outside the whitelist.
+    """
+    tree = ast.parse(source, mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported expression: {source}")
+        if isinstance(node, ast.Call) and not (
+            isinstance(node.func, ast.Name) and node.func.id in EXPRESSION_GLOBALS
+        ):
+            raise ValueError(f"Unsupported function call: {source}")
+        if isinstance(node, ast.keyword) and node.arg is None:
+            raise ValueError(f"Unsupported keyword unpacking: {source}")
+        if isinstance(node, ast.Name) and _is_dunder(node.id):
+            raise ValueError(f"Unsupported name {node.id!r}: {source}")
+        if (isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Constant)
+                and _is_dunder(node.slice.value)):
+            raise ValueError(f"Unsupported subscript {node.slice.value!r}: {source}")
+    
+    return compile(tree, filename, "eval")
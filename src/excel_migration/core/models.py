@@ -1,7 +1,13 @@
 """Core domain models for Excel migration."""
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
+from types import CodeType
 from typing import Optional, Dict, Any
+import logging
+
+from .expressions import compile_expression
+
+logger = logging.getLogger(__name__)
 
 class CellType(Enum):
     """Generic cell type classification."""
@@ -38,6 +44,31 @@ class MigrationRule:
     conditions: Optional[Dict[str, Any]] = None  # Conditions for rule application
     transformation: Optional[str] = None  # Transformation logic/formula
     llm_prompt: Optional[str] = None  # LLM prompt for complex transformations
+    preserve_style: bool = False  # Capture source cell styles alongside values
+    _parsed_sources: list[tuple[str, str]] = field(init=False, repr=False, compare=False)
+    _compiled: Optional[CodeType] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        """Split sheet-qualified source references ("Sheet!A") and compile the transformation once."""
+        self._parsed_sources = [
+            tuple(col_ref.split('!', 1)) if '!' in col_ref else ('', col_ref)
+            for col_ref in self.source_columns
+        ]
+        
+        # Only compute and aggregate rules are evaluated as expressions, restricted
+        # to the whitelist in core.expressions; other rule types, and transformations
+        # outside the whitelist, are left for the LLM path
+        self._compiled = None
+        if self.transformation and self.rule_type in (RuleType.COMPUTE, RuleType.AGGREGATE):
+            try:
+                self._compiled = compile_expression(
+                    self.transformation, f"<rule:{self.target_column}>"
+                )
+            except (SyntaxError, ValueError) as e:
+                logger.warning(
+                    f"Transformation for column {self.target_column} is not a supported "
+                    f"expression and is left for the LLM path: {str(e)}"
+                )
 
 @dataclass
 class ValidationResult:
@@ -1,14 +1,17 @@
 """Core Excel migration processor."""
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Sequence
 import openpyxl
+from openpyxl.utils import column_index_from_string
 from pathlib import Path
 import logging
 
+from .expressions import EXPRESSION_GLOBALS
 from .models import (
     MigrationContext,
     MigrationRule,
     Cell,
     CellType,
+    RuleType,
     ValidationResult
 )
 
@@ -22,6 +25,7 @@ class ExcelMigrationProcessor:
         self.context = context
         self.source_wb = None
         self.target_wb = None
+        self._header_rows: Dict[str, int] = {}  # sheet title -> header row
         self._setup_logging()
 
     def _setup_logging(self):
@@ -36,7 +40,8 @@ class ExcelMigrationProcessor:
         try:
             # Load workbooks
             self.source_wb = self._load_workbook(self.context.source_file)
-            self.target_wb = openpyxl.Workbook()
+            # Write-only mode streams rows to the archive without keeping cells in memory
+            self.target_wb = openpyxl.Workbook(write_only=True)
 
             # Process each sheet mapping
             for source_sheet_name, target_sheet_name in self.context.sheet_mapping.items():
@@ -69,12 +74,34 @@ class ExcelMigrationProcessor:
 
             # Get applicable rules for this sheet
             sheet_rules = [rule for rule in self.context.rules 
-                         if rule.source_columns[0].split('!')[0] == source_sheet_name]
+                         if rule._parsed_sources[0][0] in ('', source_sheet_name)]
 
-            # Process each row
             header_row = self._find_header_row(source_sheet)
-            for row in range(header_row + 1, source_sheet.max_row + 1):
-                self._process_row(row, source_sheet, target_sheet, sheet_rules)
+            
+            # Copies and compiled transformations only need cell values, so they
+            # run column-wise; everything else is applied per row
+            column_rules, row_rules = [], []
+            for rule in sheet_rules:
+                if not rule.preserve_style and (
+                    rule.rule_type == RuleType.COPY or rule._compiled is not None
+                ):
+                    column_rules.append(rule)
+                else:
+                    row_rules.append(rule)
+            
+            # Results are buffered per row (row -> {column: value}) and appended once
+            target_rows: Dict[int, Dict[str, Any]] = {}
+            
+            if column_rules:
+                self._apply_column_rules(header_row, source_sheet, target_rows, column_rules)
+            
+            # Process each row
+            if row_rules:
+                for row in range(header_row + 1, source_sheet.max_row + 1):
+                    self._process_row(row, source_sheet, target_rows.setdefault(row, {}),
+                                      row_rules)
+            
+            self._write_rows(target_sheet, target_rows)
 
             return True
 
@@ -83,15 +110,49 @@ class ExcelMigrationProcessor:
             return False
 
     def _find_header_row(self, sheet: openpyxl.worksheet.worksheet.Worksheet) -> int:
-        """Find the header row in a sheet."""
-        for row in range(1, min(10, sheet.max_row + 1)):
-            if any(cell.value for cell in sheet[row]):
+        """Find the header row in a sheet, cached per sheet title."""
+        if sheet.title not in self._header_rows:
+            self._header_rows[sheet.title] = self._scan_header_row(sheet)
+        return self._header_rows[sheet.title]
+
+    def _scan_header_row(self, sheet: openpyxl.worksheet.worksheet.Worksheet) -> int:
+        """Return the first non-empty row among the first 9 rows."""
+        rows = sheet.iter_rows(min_row=1, max_row=min(9, sheet.max_row), values_only=True)
+        for row, values in enumerate(rows, start=1):
+            if any(values):
                 return row
         return 1
 
+    def _apply_column_rules(self, header_row: int,
+                            source_sheet: openpyxl.worksheet.worksheet.Worksheet,
+                            target_rows: Dict[int, Dict[str, Any]],
+                            rules: List[MigrationRule]) -> None:
+        """Execute copy and compiled rules over whole columns from a single values-only read."""
+        rows = source_sheet.iter_rows(min_row=header_row + 1, values_only=True)
+        columns = list(zip(*rows))
+        empty = (None,) * (len(columns[0]) if columns else 0)
+        
+        def column(col: str) -> Sequence[Any]:
+            col_idx = column_index_from_string(col) - 1
+            return columns[col_idx] if col_idx < len(columns) else empty
+        
+        for rule in rules:
+            if rule.rule_type == RuleType.COPY:
+                results = column(rule._parsed_sources[0][1])
+            else:
+                cols = [col for sheet_name, col in rule._parsed_sources
+                        if not sheet_name or sheet_name == source_sheet.title]
+                results = [
+                    self._evaluate_rule(rule, dict(zip(cols, values)))
+                    for values in zip(*map(column, cols))
+                ]
+            
+            for row, value in enumerate(results, start=header_row + 1):
+                if value is not None:
+                    target_rows.setdefault(row, {})[rule.target_column] = value
+
     def _process_row(self, row: int, source_sheet: openpyxl.worksheet.worksheet.Worksheet,
-                    target_sheet: openpyxl.worksheet.worksheet.Worksheet,
-                    rules: List[MigrationRule]) -> None:
+                    target_row: Dict[str, Any], rules: List[MigrationRule]) -> None:
         """Process a single row according to rules."""
         for rule in rules:
             # Extract source values
@@ -100,37 +161,42 @@ class ExcelMigrationProcessor:
             # Apply rule
             result = self._apply_rule(rule, source_values)
             
-            # Write result to target
+            # Buffer result for the target row
             if result is not None:
-                self._write_result(row, target_sheet, rule.target_column, result)
+                target_row[rule.target_column] = result
 
     def _get_source_values(self, row: int, sheet: openpyxl.worksheet.worksheet.Worksheet,
                          rule: MigrationRule) -> Dict[str, Cell]:
         """Get source values for a rule."""
         values = {}
-        for col_ref in rule.source_columns:
-            sheet_name, col = col_ref.split('!') if '!' in col_ref else ('', col_ref)
+        for sheet_name, col in rule._parsed_sources:
             if not sheet_name or sheet_name == sheet.title:
-                cell = sheet[f"{col}{row}"]
+                # Address by index rather than building and parsing "A12"
+                column = column_index_from_string(col)
+                cell = sheet.cell(row=row, column=column)
                 values[col] = Cell(
                     value=cell.value,
                     cell_type=self._determine_cell_type(cell),
                     row=row,
-                    column=openpyxl.utils.column_index_from_string(col),
-                    formula=cell.formula if cell.formula else None,
-                    style={
-                        'font': cell.font,
-                        'fill': cell.fill,
-                        'border': cell.border,
-                        'alignment': cell.alignment,
-                        'number_format': cell.number_format
-                    }
+                    column=column,
+                    formula=cell.value if cell.data_type == 'f' else None,
+                    style=self._extract_style(cell) if rule.preserve_style else None
                 )
         return values
 
+    def _extract_style(self, cell: openpyxl.cell.cell.Cell) -> Dict[str, Any]:
+        """Collect the style attributes of a cell."""
+        return {
+            'font': cell.font,
+            'fill': cell.fill,
+            'border': cell.border,
+            'alignment': cell.alignment,
+            'number_format': cell.number_format
+        }
+
     def _determine_cell_type(self, cell: openpyxl.cell.cell.Cell) -> CellType:
         """Determine the type of a cell."""
-        if cell.formula:
+        if cell.data_type == 'f':
             return CellType.FORMULA
         if isinstance(cell.value, (int, float)):
             return CellType.NUMBER
@@ -142,18 +208,54 @@ class ExcelMigrationProcessor:
 
     def _apply_rule(self, rule: MigrationRule, source_values: Dict[str, Cell]) -> Any:
         """Apply a migration rule to source values."""
-        # Implement rule application logic based on rule type
+        if rule.rule_type == RuleType.COPY:
+            source = next(iter(source_values.values()), None)
+            return source.value if source else None
+        
+        if rule._compiled is not None:
+            return self._evaluate_rule(
+                rule, {col: cell.value for col, cell in source_values.items()}
+            )
+        
+        # Implement rule application logic for the remaining rule types
         # This will be extended with LLM integration for complex transformations
-        pass
+        return None
+
+    def _evaluate_rule(self, rule: MigrationRule, values: Dict[str, Any]) -> Any:
+        """Evaluate a compiled rule against one row's values.
+        
+        Source columns are exposed by letter, e.g. "A * 2" or "B + C". A row that
+        fails (an empty or non-numeric cell, say) is logged and yields None rather
+        than failing the sheet.
+        """
+        try:
+            return eval(rule._compiled, EXPRESSION_GLOBALS, values)
+        except Exception as e:
+            logger.warning(f"Rule for column {rule.target_column} failed on {values}: {str(e)}")
+            return None
 
-    def _write_result(self, row: int, sheet: openpyxl.worksheet.worksheet.Worksheet,
-                     column: str, value: Any) -> None:
-        """Write a result to the target sheet."""
-        cell = sheet[f"{column}{row}"]
-        cell.value = value
+    def _write_rows(self, sheet: openpyxl.worksheet._write_only.WriteOnlyWorksheet,
+                    target_rows: Dict[int, Dict[str, Any]]) -> None:
+        """Append buffered results to the target sheet, keeping source row positions."""
+        if not target_rows:
+            return
+        
+        positions = {
+            column: column_index_from_string(column) - 1
+            for values in target_rows.values()
+            for column in values
+        }
+        width = max(positions.values(), default=-1) + 1
+        
+        for row in range(1, max(target_rows) + 1):
+            row_values = [None] * width
+            for column, value in target_rows.get(row, {}).items():
+                row_values[positions[column]] = value
+            sheet.append(row_values)
 
     def _cleanup(self) -> None:
         """Clean up resources."""
+        self._header_rows.clear()
         if self.source_wb:
             self.source_wb.close()
         if self.target_wb:
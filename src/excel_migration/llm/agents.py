@@ -1,15 +1,34 @@
 """LangChain agents for Excel data processing."""
-from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Literal, Optional, Tuple
 from langchain.agents import AgentType, initialize_agent
 from langchain.agents.tools import Tool
 from langchain.chains import LLMChain
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.language_models import BaseLanguageModel
 from langchain.tools import BaseTool
+from pydantic import BaseModel
 import logging
 
+from .serialization import serialize_for_prompt
+
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r"[a-z]+")
+_RECOMMEND_RE = re.compile(r"recommend|suggest|should|could", re.IGNORECASE)
+_WARN_RE = re.compile(r"warning|caution|careful|note", re.IGNORECASE)
+
+class PlanStep(BaseModel):
+    """A subtask assigned to one agent by the coordinator."""
+    agent: Literal["formula", "validation", "transformation"]
+    subtask: str
+
+class CoordinationPlan(BaseModel):
+    """Structured coordinator output."""
+    steps: List[PlanStep]
+
 class ExcelTools:
     """Collection of tools for Excel data processing."""
     
@@ -40,40 +59,84 @@ class ExcelTools:
             func=lambda text, rules: f"Transformed text: {text}..."
         )
 
+# Stateless tools shared by every agent
+_SHARED_TOOLS = [
+    ExcelTools.create_formula_analyzer(),
+    ExcelTools.create_data_validator(),
+    ExcelTools.create_text_transformer()
+]
+
 class ExcelAgent:
     """Agent for handling complex Excel operations."""
     
-    def __init__(self, llm: BaseLanguageModel):
-        """Initialize with a language model."""
+    __slots__ = (
+        "llm", "max_tools", "extra_tools", "tools", "_tool_terms", "_executors", "agent"
+    )
+    
+    def __init__(self, llm: BaseLanguageModel, extra_tools: Optional[List[Tool]] = None,
+                 max_tools: int = 3):
+        """Initialize with a language model and optional specialized tools.
+        
+        Each task is given the specialized ``extra_tools`` plus as many shared
+        tools as fit in ``max_tools``, picked by word overlap between the task and
+        the tool names and descriptions. The full-toolset agent is only built when
+        no selection is needed.
+        """
         self.llm = llm
-        self.tools = self._setup_tools()
-        self.agent = self._create_agent()
+        self.max_tools = max_tools
+        # Agent executors keyed by tool names; bounded by the tool subsets this
+        # agent can select, and released with the agent
+        self._executors: Dict[Tuple[str, ...], Any] = {}
+        self.extra_tools = extra_tools or []
+        self.tools = self._setup_tools(self.extra_tools)
+        self._tool_terms = [
+            set(_WORD_RE.findall(f"{tool.name} {tool.description}".lower()))
+            for tool in _SHARED_TOOLS
+        ]
+        self.agent = self._create_agent() if len(self.tools) <= max_tools else None
     
-    def _setup_tools(self) -> List[Tool]:
+    def _setup_tools(self, extra_tools: List[Tool]) -> List[Tool]:
         """Set up the tools available to the agent."""
-        return [
-            ExcelTools.create_formula_analyzer(),
-            ExcelTools.create_data_validator(),
-            ExcelTools.create_text_transformer()
-        ]
+        return _SHARED_TOOLS + extra_tools
     
-    def _create_agent(self):
-        """Create the agent with tools."""
-        return initialize_agent(
-            tools=self.tools,
-            llm=self.llm,
-            agent=AgentType.CHAT_CONVERSATIONAL_REACT_DESCRIPTION,
-            verbose=True
+    def _create_agent(self, tools: Optional[List[Tool]] = None):
+        """Create the agent with tools, reusing an executor built for the same setup."""
+        tools = tools or self.tools
+        key = tuple(tool.name for tool in tools)
+        if key not in self._executors:
+            self._executors[key] = initialize_agent(
+                tools=tools,
+                llm=self.llm,
+                agent=AgentType.CHAT_CONVERSATIONAL_REACT_DESCRIPTION,
+                verbose=True
+            )
+        return self._executors[key]
+    
+    def _select_agent(self, task: str):
+        """Return an agent limited to the tools most relevant to the task."""
+        if len(self.tools) <= self.max_tools:
+            return self.agent
+        
+        # The specialized tools are always kept; shared tools fill the remaining slots
+        task_terms = set(_WORD_RE.findall(task.lower()))
+        ranked = sorted(
+            range(len(_SHARED_TOOLS)),
+            key=lambda i: len(task_terms & self._tool_terms[i]),
+            reverse=True
         )
+        slots = max(self.max_tools - len(self.extra_tools), 0)
+        selected = sorted(ranked[:slots])  # keep the declared tool order
+        return self._create_agent([_SHARED_TOOLS[i] for i in selected] + self.extra_tools)
     
     async def process_task(self, task: str, context: Dict[str, Any]) -> Any:
         """Process a task using the agent."""
         try:
-            result = await self.agent.arun(
-                input=task,
-                context=str(context)
-            )
-            return result
+            agent = self._select_agent(task)
+            result = await agent.ainvoke({
+                "input": task,
+                "context": serialize_for_prompt(context)
+            })
+            return result["output"]
         except Exception as e:
             logger.error(f"Agent task processing failed: {str(e)}")
             return None
@@ -81,52 +144,134 @@ class ExcelAgent:
 class MultiAgentSystem:
     """System for coordinating multiple agents."""
     
-    def __init__(self, llm: BaseLanguageModel):
-        """Initialize with a language model."""
+    __slots__ = (
+        "llm", "strategy", "max_concurrency", "agents",
+        "coordinator", "structured_coordinator", "analysis_chain"
+    )
+    
+    # Prompts are static, so they are parsed once and shared by all instances
+    coordinator_prompt = ChatPromptTemplate.from_messages([
+        ("system", """You are a coordinator for Excel data processing tasks.
+        Analyze the task and split it into independent subtasks, each handled by one specialized agent.
+        Available agents: formula, validation, transformation.
+        Output only a JSON list in format: [{{"agent": "formula", "subtask": "..."}}]"""),
+        ("user", "{task}")
+    ])
+    
+    analysis_prompt = ChatPromptTemplate.from_messages([
+        ("system", """You are an expert at analyzing Excel data structures and migrations.
+        Analyze the provided sheet structure and mapping to provide insights for migration.
+        Consider data types, formulas, and potential transformation needs."""),
+        ("user", """Sheet Analysis: {sheet_analysis}
+        Mapping: {mapping}
+        Context: {context}""")
+    ])
+    
+    def __init__(self, llm: BaseLanguageModel,
+                 strategy: Literal["sequential", "concurrent"] = "concurrent",
+                 max_concurrency: int = 3):
+        """Initialize with a language model.
+        
+        With the concurrent strategy, independent subtasks from the coordinator's
+        plan run in parallel, at most max_concurrency at a time.
+        """
         self.llm = llm
+        self.strategy = strategy
+        self.max_concurrency = max_concurrency
         self.agents = self._setup_agents()
         self._setup_coordination_chain()
+        self._setup_analysis_chain()
     
     def _setup_agents(self) -> Dict[str, ExcelAgent]:
         """Set up specialized agents."""
+        # The agents differ only by role, so they share one instance
+        agent = ExcelAgent(self.llm)
         return {
-            "formula": ExcelAgent(self.llm),
-            "validation": ExcelAgent(self.llm),
-            "transformation": ExcelAgent(self.llm)
+            "formula": agent,
+            "validation": agent,
+            "transformation": agent
         }
     
     def _setup_coordination_chain(self):
         """Set up the coordination chain."""
-        self.coordinator_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a coordinator for Excel data processing tasks.
-            Analyze the task and determine which specialized agent should handle it.
-            Available agents: formula, validation, transformation.
-            Output the agent name and subtask in format: AGENT:subtask"""),
-            ("user", "{task}")
-        ])
-        
         self.coordinator = LLMChain(
             llm=self.llm,
             prompt=self.coordinator_prompt
         )
+        
+        # Models with tool calling return the plan as typed data; others fall
+        # back to parsing the text output of the coordinator chain
+        try:
+            self.structured_coordinator = (
+                self.coordinator_prompt | self.llm.with_structured_output(CoordinationPlan)
+            )
+        except (AttributeError, NotImplementedError):
+            self.structured_coordinator = None
+    
+    def _setup_analysis_chain(self):
+        """Set up the chain used by analyze_task."""
+        self.analysis_chain = LLMChain(
+            llm=self.llm,
+            prompt=self.analysis_prompt
+        )
     
     async def process_task(self, task: str, context: Optional[Dict[str, Any]] = None) -> Any:
-        """Process a task using the appropriate agent."""
+        """Process a task using the appropriate agents.
+        
+        Returns the agent's result when the plan has a single subtask, otherwise
+        a dict of results keyed by agent name.
+        """
         try:
-            # Determine which agent should handle the task
-            coordination_result = await self.coordinator.arun(task=task)
-            agent_name, subtask = coordination_result.split(":", 1)
+            # Determine which agents should handle the task
+            if self.structured_coordinator is not None:
+                coordination = await self.structured_coordinator.ainvoke({"task": task})
+                plan = [(step.agent, step.subtask.strip()) for step in coordination.steps]
+            else:
+                coordination_result = (await self.coordinator.ainvoke({"task": task}))["text"]
+                plan = self._parse_plan(coordination_result)
             
-            if agent_name.lower().strip() not in self.agents:
-                raise ValueError(f"Unknown agent: {agent_name}")
+            for agent_name, _ in plan:
+                if agent_name not in self.agents:
+                    raise ValueError(f"Unknown agent: {agent_name}")
             
-            # Execute the task with the chosen agent
-            agent = self.agents[agent_name.lower().strip()]
-            return await agent.process_task(subtask.strip(), context or {})
+            # Execute the subtasks with the chosen agents
+            context = context or {}
+            if self.strategy == "concurrent":
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                
+                async def run(agent_name: str, subtask: str) -> Any:
+                    async with semaphore:
+                        return await self.agents[agent_name].process_task(subtask, context)
+                
+                results = await asyncio.gather(*[run(name, subtask) for name, subtask in plan])
+            else:
+                results = [
+                    await self.agents[name].process_task(subtask, context)
+                    for name, subtask in plan
+                ]
+            
+            if len(plan) == 1:
+                return results[0]
+            return {name: result for (name, _), result in zip(plan, results)}
             
         except Exception as e:
             logger.error(f"Multi-agent task processing failed: {str(e)}")
             return None
+    
+    def _parse_plan(self, coordination_result: str) -> List[Tuple[str, str]]:
+        """Parse the coordinator output into (agent, subtask) pairs."""
+        try:
+            plan = json.loads(coordination_result)
+            if isinstance(plan, dict):
+                plan = [plan]
+            return [
+                (str(step["agent"]).lower().strip(), str(step["subtask"]).strip())
+                for step in plan
+            ]
+        except (ValueError, TypeError, KeyError):
+            # Fall back to the plain "AGENT:subtask" format
+            agent_name, subtask = coordination_result.split(":", 1)
+            return [(agent_name.lower().strip(), subtask.strip())]
 
     async def analyze_task(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze a task context and provide insights."""
@@ -135,33 +280,19 @@ class MultiAgentSystem:
             sheet_analysis = context.get("sheet_analysis", {})
             mapping = context.get("mapping", {})
             
-            # Create analysis prompt
-            analysis_prompt = ChatPromptTemplate.from_messages([
-                ("system", """You are an expert at analyzing Excel data structures and migrations.
-                Analyze the provided sheet structure and mapping to provide insights for migration.
-                Consider data types, formulas, and potential transformation needs."""),
-                ("user", """Sheet Analysis: {sheet_analysis}
-                Mapping: {mapping}
-                Context: {context}""")
-            ])
-            
-            analysis_chain = LLMChain(
-                llm=self.llm,
-                prompt=analysis_prompt
-            )
-            
             # Get analysis
-            result = await analysis_chain.arun(
-                sheet_analysis=str(sheet_analysis),
-                mapping=str(mapping),
-                context=str(context)
-            )
+            result = (await self.analysis_chain.ainvoke({
+                "sheet_analysis": serialize_for_prompt(sheet_analysis),
+                "mapping": serialize_for_prompt(mapping),
+                "context": serialize_for_prompt(context)
+            }))["text"]
             
             # Parse and structure the analysis
+            recommendations, warnings = self._extract_insights(result)
             return {
                 "insights": result,
-                "recommendations": self._extract_recommendations(result),
-                "warnings": self._extract_warnings(result)
+                "recommendations": recommendations,
+                "warnings": warnings
             }
             
         except Exception as e:
@@ -172,25 +303,40 @@ class MultiAgentSystem:
                 "warnings": [str(e)]
             }
     
-    def _extract_recommendations(self, analysis: str) -> List[str]:
-        """Extract recommendations from analysis text."""
-        # Simple extraction - split on newlines and look for recommendation-like statements
-        recommendations = []
-        for line in analysis.split('\n'):
-            line = line.strip().lower()
-            if any(word in line for word in ['recommend', 'suggest', 'should', 'could']):
-                recommendations.append(line)
-        return recommendations
-    
-    def _extract_warnings(self, analysis: str) -> List[str]:
-        """Extract warnings from analysis text."""
-        # Simple extraction - split on newlines and look for warning-like statements
-        warnings = []
-        for line in analysis.split('\n'):
-            line = line.strip().lower()
-            if any(word in line for word in ['warning', 'caution', 'careful', 'note']):
-                warnings.append(line)
-        return warnings
+    def _extract_insights(self, analysis: str) -> Tuple[List[str], List[str]]:
+        """Extract recommendations and warnings from analysis text in one pass."""
+        # Simple extraction - split on newlines and look for recommendation-
+        # and warning-like statements
+        recommendations, warnings = [], []
+        for line in analysis.splitlines():
+            is_recommendation = _RECOMMEND_RE.search(line)
+            is_warning = _WARN_RE.search(line)
+            if is_recommendation or is_warning:
+                line = line.strip().lower()
+                if is_recommendation:
+                    recommendations.append(line)
+                if is_warning:
+                    warnings.append(line)
+        return recommendations, warnings
+
+# Specialized tools added by AgentFactory, one per agent type
+_SPECIALIZED_TOOLS = {
+    "formula": Tool(
+        name="advanced_formula_analysis",
+        description="Advanced analysis of Excel formulas including optimization suggestions",
+        func=lambda formula: f"Advanced analysis: {formula}..."
+    ),
+    "validation": Tool(
+        name="advanced_validation",
+        description="Advanced data validation with custom rules and error reporting",
+        func=lambda data, rules: f"Advanced validation: {data}..."
+    ),
+    "transformation": Tool(
+        name="advanced_transformation",
+        description="Advanced data transformation with custom rules and formatting",
+        func=lambda data, rules: f"Advanced transformation: {data}..."
+    )
+}
 
 class AgentFactory:
     """Factory for creating specialized agents."""
@@ -198,28 +344,7 @@ class AgentFactory:
     @staticmethod
     def create_agent(agent_type: str, llm: BaseLanguageModel) -> ExcelAgent:
         """Create a specialized agent."""
-        agent = ExcelAgent(llm)
-        
-        # Add specialized tools based on agent type
-        if agent_type == "formula":
-            agent.tools.append(Tool(
-                name="advanced_formula_analysis",
-                description="Advanced analysis of Excel formulas including optimization suggestions",
-                func=lambda formula: f"Advanced analysis: {formula}..."
-            ))
-        elif agent_type == "validation":
-            agent.tools.append(Tool(
-                name="advanced_validation",
-                description="Advanced data validation with custom rules and error reporting",
-                func=lambda data, rules: f"Advanced validation: {data}..."
-            ))
-        elif agent_type == "transformation":
-            agent.tools.append(Tool(
-                name="advanced_transformation",
-                description="Advanced data transformation with custom rules and formatting",
-                func=lambda data, rules: f"Advanced transformation: {data}..."
-            ))
-        else:
+        if agent_type not in _SPECIALIZED_TOOLS:
             raise ValueError(f"Unknown agent type: {agent_type}")
         
-        return agent
\ No newline at end of file
+        return ExcelAgent(llm, extra_tools=[_SPECIALIZED_TOOLS[agent_type]])
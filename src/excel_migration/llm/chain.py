@@ -1,63 +1,128 @@
 """LangChain integration for Excel migrations."""
-from typing import Any, Dict, Optional, List
+import asyncio
+import functools
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, List, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_community.chat_models import ChatAnthropic
-from langchain.prompts import ChatPromptTemplate
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.language_models import BaseLanguageModel
 from langchain.chains import LLMChain
 from langchain.chains.base import Chain
-from langchain.memory import ConversationBufferMemory
-from langchain.callbacks.base import BaseCallbackHandler
+from langchain.memory import ConversationSummaryBufferMemory
+from langchain.callbacks.base import AsyncCallbackHandler
 import logging
 
 from .agents import MultiAgentSystem, ExcelAgent, AgentFactory
+from .serialization import serialize_for_prompt
+from ..plugins.interfaces import TransformationHandler
+from ..plugins.base import (
+    DateTimeTransformer,
+    NumericTransformer,
+    BooleanTransformer,
+    ConcatenateTransformer
+)
 
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+
+@functools.lru_cache(maxsize=32)
+def _build_llm(provider: str, frozen_kwargs: Tuple[Tuple[str, Any], ...]) -> BaseLanguageModel:
+    """Construct an LLM client; cached by LLMProvider.create_llm."""
+    kwargs = dict(frozen_kwargs)
+    if provider == "openai":
+        return ChatOpenAI(**kwargs)
+    elif provider == "anthropic":
+        return ChatAnthropic(**kwargs)
+    else:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+
 class LLMProvider:
     """Factory for creating LLM instances."""
     
     @staticmethod
     def create_llm(provider: str, **kwargs) -> BaseLanguageModel:
-        """Create an LLM instance based on provider name."""
-        if provider.lower() == "openai":
-            return ChatOpenAI(**kwargs)
-        elif provider.lower() == "anthropic":
-            return ChatAnthropic(**kwargs)
-        else:
-            raise ValueError(f"Unsupported LLM provider: {provider}")
+        """Create an LLM instance based on provider name.
+        
+        Clients are cached per provider and keyword arguments, so repeated calls
+        share one client and its connection pool. Varying the arguments between
+        calls creates a new client each time; unhashable arguments bypass the cache.
+        """
+        frozen_kwargs = tuple(sorted(kwargs.items()))
+        try:
+            hash(frozen_kwargs)
+        except TypeError:
+            return _build_llm.__wrapped__(provider.lower(), frozen_kwargs)
+        return _build_llm(provider.lower(), frozen_kwargs)
 
 class ChainManager:
-    """Manager for LangChain components."""
+    """Manager for LangChain components.
+    
+    Chain prompts keep the static system text first, followed by the conversation
+    history and then the per-call values, so repeated calls share a stable prefix
+    that provider-side prompt caching can reuse.
+    """
     
-    def __init__(self, llm: BaseLanguageModel):
+    __slots__ = (
+        "llm", "escalation_llm", "memory", "multi_agent_system",
+        "transformation_chain", "escalation_chain", "validation_chain", "formula_chain",
+        "batch_transformation_chain", "batch_escalation_chain"
+    )
+    
+    def __init__(self, llm: BaseLanguageModel, memory_token_limit: int = 2000,
+                 escalation_llm: Optional[BaseLanguageModel] = None):
+        """Initialize the chains.
+        
+        ``llm`` should be the cheaper model; when ``escalation_llm`` is given, a
+        second transformation chain on it is used for outputs the first rejects.
+        The batch chains have no memory: concurrent calls would interleave their
+        saves and summarization, so batches are given the history as an input.
+        """
         self.llm = llm
-        self.memory = ConversationBufferMemory(
+        self.escalation_llm = escalation_llm
+        # Older turns are summarized so the history stays bounded over long migrations
+        self.memory = ConversationSummaryBufferMemory(
+            llm=llm,
+            max_token_limit=memory_token_limit,
             memory_key="chat_history",
             return_messages=True
         )
         self.multi_agent_system = MultiAgentSystem(llm)
         self.transformation_chain = self._create_transformation_chain()
+        self.escalation_chain = (
+            self._create_transformation_chain(escalation_llm) if escalation_llm else None
+        )
+        self.batch_transformation_chain = self._create_transformation_chain(with_memory=False)
+        self.batch_escalation_chain = (
+            self._create_transformation_chain(escalation_llm, with_memory=False)
+            if escalation_llm else None
+        )
         self.validation_chain = self._create_validation_chain()
         self.formula_chain = self._create_formula_chain()
     
-    def _create_transformation_chain(self) -> Chain:
-        """Create the transformation chain."""
+    def _create_transformation_chain(self, llm: Optional[BaseLanguageModel] = None,
+                                     with_memory: bool = True) -> Chain:
+        """Create the transformation chain, on ``llm`` or the default model.
+        
+        Without memory, callers pass ``chat_history`` with the other inputs.
+        """
         prompt = ChatPromptTemplate.from_messages([
             ("system", """You are an expert at transforming Excel data.
             Given source data and transformation rules, output the transformed data.
             Consider the context and previous transformations in your decisions."""),
-            ("human", """Source Data: {source_data}
-            Transformation Rules: {rules}
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("human", """Transformation Rules: {rules}
             Context: {context}
-            Previous Transformations: {chat_history}
+            Source Data: {source_data}
             """)
         ])
         
         return LLMChain(
-            llm=self.llm,
+            llm=llm or self.llm,
             prompt=prompt,
-            memory=self.memory,
+            memory=self.memory if with_memory else None,
             verbose=True
         )
     
@@ -67,10 +132,10 @@ class ChainManager:
             ("system", """You are an expert at validating Excel data.
             Given data and validation rules, determine if the data is valid.
             Provide detailed feedback on any validation failures."""),
-            ("human", """Data to Validate: {data}
-            Validation Rules: {rules}
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("human", """Validation Rules: {rules}
             Context: {context}
-            Previous Validations: {chat_history}
+            Data to Validate: {data}
             """)
         ])
         
@@ -87,9 +152,9 @@ class ChainManager:
             ("system", """You are an expert at analyzing Excel formulas.
             Given a formula, explain its logic and suggest optimizations.
             Consider the context and previous analyses in your suggestions."""),
-            ("human", """Formula: {formula}
-            Context: {context}
-            Previous Analyses: {chat_history}
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("human", """Context: {context}
+            Formula: {formula}
             """)
         ])
         
@@ -103,9 +168,24 @@ class ChainManager:
 class ExcelProcessor:
     """Processor for Excel-specific operations using LangChain."""
     
-    def __init__(self, chain_manager: ChainManager):
+    __slots__ = ("chain_manager", "agents", "_local_handlers", "cache_size", "_cache")
+    
+    def __init__(self, chain_manager: ChainManager, cache_size: int = 10_000):
         self.chain_manager = chain_manager
         self.agents: Dict[str, ExcelAgent] = {}
+        # Deterministic transformation types are handled locally without the LLM
+        self._local_handlers: Dict[str, TransformationHandler] = {
+            handler.transformation_type: handler
+            for handler in (
+                DateTimeTransformer(),
+                NumericTransformer(),
+                BooleanTransformer(),
+                ConcatenateTransformer()
+            )
+        }
+        # Transformation results keyed by (rules, data, context), least recently used first
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
     
     def get_or_create_agent(self, agent_type: str) -> ExcelAgent:
         """Get an existing agent or create a new one."""
@@ -117,36 +197,162 @@ class ExcelProcessor:
         return self.agents[agent_type]
     
     async def process_transformation(self, data: Any, rules: Dict[str, Any],
-                                  context: Optional[Dict[str, Any]] = None) -> Any:
-        """Process a data transformation."""
+                                  context: Optional[Dict[str, Any]] = None,
+                                  skip_coordination: bool = False) -> Any:
+        """Process a data transformation.
+        
+        Complex transformations normally go through the coordinator first. When the
+        rules name an ``agent`` or ``skip_coordination`` is set, the agent (default
+        "transformation") is called directly, saving the coordinator LLM call.
+        """
         try:
+            result = self._transform_locally(data, rules)
+            if result is not _MISSING:
+                return result
+            
+            # Repeated (rules, data) pairs are answered without calling the LLM
+            key = self._cache_key(data, rules, context)
+            result = self._cache_get(key)
+            if result is not _MISSING:
+                return result
+            
             # Use multi-agent system for complex transformations
             if self._is_complex_transformation(rules):
-                return await self.chain_manager.multi_agent_system.process_task(
-                    task=f"Transform data according to rules: {rules}",
-                    context={"data": data, **(context or {})}
-                )
+                multi_agent_system = self.chain_manager.multi_agent_system
+                task = f"Transform data according to rules: {serialize_for_prompt(rules)}"
+                task_context = {"data": data, **(context or {})}
+                if skip_coordination or "agent" in rules:
+                    agent_name = rules.get("agent", "transformation")
+                    if agent_name not in multi_agent_system.agents:
+                        raise ValueError(f"Unknown agent: {agent_name}")
+                    result = await multi_agent_system.agents[agent_name].process_task(
+                        task, task_context
+                    )
+                else:
+                    result = await multi_agent_system.process_task(
+                        task=task,
+                        context=task_context
+                    )
+            else:
+                # Use transformation chain for simple transformations
+                inputs = self._transformation_inputs(data, rules, context)
+                result = (await self.chain_manager.transformation_chain.ainvoke(inputs))["text"]
+                
+                # Escalate rejected outputs to the stronger model when configured
+                escalation_chain = self.chain_manager.escalation_chain
+                if escalation_chain and self._needs_escalation(result):
+                    result = (await escalation_chain.ainvoke(inputs))["text"]
             
-            # Use transformation chain for simple transformations
-            return await self.chain_manager.transformation_chain.arun(
-                source_data=str(data),
-                rules=str(rules),
-                context=str(context or {})
-            )
+            # Rejected outputs are retried on the next call rather than cached
+            if not self._needs_escalation(result):
+                self._cache_put(key, result)
+            return result
             
         except Exception as e:
             logger.error(f"Transformation failed: {str(e)}")
             return None
     
+    async def process_transformations(self, batch: List[Dict[str, Any]],
+                                      max_concurrency: int = 8) -> List[Any]:
+        """Process many transformations at once.
+        
+        Each item holds ``data``, ``rules`` and an optional ``context``. Simple
+        transformations go through a single batched chain call and at most
+        ``max_concurrency`` complex ones run at a time; results are returned in
+        input order, with None for items that failed.
+        
+        Batched calls all see the conversation history as it was when the batch
+        started and are not added to it.
+        """
+        results: List[Any] = [None] * len(batch)
+        simple: Dict[str, List[int]] = {}  # cache key -> positions of uncached items
+        complex_ = []
+        for i, item in enumerate(batch):
+            if self._is_complex_transformation(item["rules"]):
+                complex_.append(i)
+                continue
+            try:
+                local = self._transform_locally(item["data"], item["rules"])
+            except Exception as e:
+                logger.error(f"Transformation failed: {str(e)}")
+                continue
+            if local is not _MISSING:
+                results[i] = local
+                continue
+            key = self._cache_key(item["data"], item["rules"], item.get("context"))
+            cached = self._cache_get(key)
+            if cached is not _MISSING:
+                results[i] = cached
+            else:
+                simple.setdefault(key, []).append(i)
+        
+        # Identical items in the batch share one chain input; rejected outputs
+        # from the default model get a second batched pass on the escalation model
+        pending = simple
+        chains = [
+            self.chain_manager.batch_transformation_chain,
+            self.chain_manager.batch_escalation_chain
+        ]
+        history = (
+            self.chain_manager.memory.load_memory_variables({})["chat_history"]
+            if pending else []
+        )
+        for chain in chains:
+            if not pending or chain is None:
+                break
+            outputs = await chain.abatch(
+                [
+                    {
+                        **self._transformation_inputs(
+                            batch[positions[0]]["data"],
+                            batch[positions[0]]["rules"],
+                            batch[positions[0]].get("context")
+                        ),
+                        "chat_history": history
+                    }
+                    for positions in pending.values()
+                ],
+                config={"max_concurrency": max_concurrency},
+                return_exceptions=True
+            )
+            rejected = {}
+            for (key, positions), output in zip(pending.items(), outputs):
+                if isinstance(output, Exception):
+                    logger.error(f"Transformation failed: {str(output)}")
+                    rejected[key] = positions
+                    continue
+                if self._needs_escalation(output["text"]):
+                    rejected[key] = positions
+                else:
+                    self._cache_put(key, output["text"])
+                for i in positions:
+                    results[i] = output["text"]
+            pending = rejected
+        
+        if complex_:
+            semaphore = asyncio.Semaphore(max_concurrency)
+            
+            async def run(item: Dict[str, Any]) -> Any:
+                async with semaphore:
+                    return await self.process_transformation(
+                        item["data"], item["rules"], item.get("context")
+                    )
+            
+            outputs = await asyncio.gather(*[run(batch[i]) for i in complex_])
+            for i, output in zip(complex_, outputs):
+                results[i] = output
+        
+        return results
+    
     async def validate_data(self, data: Any, rules: Dict[str, Any],
                           context: Optional[Dict[str, Any]] = None) -> bool:
         """Validate data against rules."""
         try:
-            result = await self.chain_manager.validation_chain.arun(
-                data=str(data),
-                rules=str(rules),
-                context=str(context or {})
-            )
+            result = (await self.chain_manager.validation_chain.ainvoke({
+                "data": serialize_for_prompt(data),
+                "rules": serialize_for_prompt(rules),
+                "context": serialize_for_prompt(context or {})
+            }))["text"]
             return result.lower().startswith("valid")
             
         except Exception as e:
@@ -157,51 +363,106 @@ class ExcelProcessor:
                             context: Optional[Dict[str, Any]] = None) -> str:
         """Analyze an Excel formula."""
         try:
-            return await self.chain_manager.formula_chain.arun(
-                formula=formula,
-                context=str(context or {})
-            )
+            result = await self.chain_manager.formula_chain.ainvoke({
+                "formula": formula,
+                "context": serialize_for_prompt(context or {})
+            })
+            return result["text"]
             
         except Exception as e:
             logger.error(f"Formula analysis failed: {str(e)}")
             return f"Error analyzing formula: {str(e)}"
     
+    def _transformation_inputs(self, data: Any, rules: Dict[str, Any],
+                               context: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Build the transformation chain inputs."""
+        return {
+            "source_data": serialize_for_prompt(data),
+            "rules": serialize_for_prompt(rules),
+            "context": serialize_for_prompt(context or {})
+        }
+    
+    def _needs_escalation(self, result: Any) -> bool:
+        """Check whether a transformation output should be retried on the stronger model."""
+        text = str(result or "").strip()
+        return not text or text.upper().startswith("ERROR")
+    
+    def _transform_locally(self, data: Any, rules: Dict[str, Any]) -> Any:
+        """Apply a simple rule with a local plugin handler, or return _MISSING."""
+        if self._is_complex_transformation(rules):
+            return _MISSING
+        
+        trans_type = rules.get("type")
+        if trans_type == "direct":
+            return data
+        
+        handler = self._local_handlers.get(trans_type)
+        if handler is None:
+            return _MISSING
+        return handler.transform(data, rules.get("params", {}))
+    
+    def _cache_key(self, data: Any, rules: Dict[str, Any],
+                   context: Optional[Dict[str, Any]]) -> str:
+        """Build the response cache key for a transformation."""
+        payload = "|".join(self._transformation_inputs(data, rules, context).values())
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+    
+    def _cache_get(self, key: str) -> Any:
+        """Return a cached result, or _MISSING."""
+        if key not in self._cache:
+            return _MISSING
+        self._cache.move_to_end(key)
+        return self._cache[key]
+    
+    def _cache_put(self, key: str, result: Any) -> None:
+        """Cache a result, evicting the least recently used entry when full."""
+        if result is None:
+            return  # failures are retried rather than cached
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
     def _is_complex_transformation(self, rules: Dict[str, Any]) -> bool:
         """Determine if a transformation requires the multi-agent system."""
         # Add logic to determine complexity based on rules
         return len(rules.get("steps", [])) > 1 or "llm_prompt" in rules
 
-class ProcessingCallback(BaseCallbackHandler):
-    """Callback handler for monitoring LangChain operations."""
+class ProcessingCallback(AsyncCallbackHandler):
+    """Callback handler for monitoring LangChain operations.
+    
+    Async so that async chains await it directly instead of running it in an
+    executor thread.
+    """
     
-    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs):
+    async def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs):
         """Log when LLM starts processing."""
-        logger.info(f"Starting LLM operation with {len(prompts)} prompts")
+        logger.info("Starting LLM operation with %d prompts", len(prompts))
     
-    def on_llm_end(self, response, **kwargs):
+    async def on_llm_end(self, response, **kwargs):
         """Log when LLM completes processing."""
         logger.info("LLM operation completed")
     
-    def on_chain_start(self, serialized: Dict[str, Any], inputs: Dict[str, Any], **kwargs):
+    async def on_chain_start(self, serialized: Dict[str, Any], inputs: Dict[str, Any], **kwargs):
         """Log when a chain starts processing."""
-        logger.info(f"Starting chain operation: {serialized.get('name', 'Unknown chain')}")
+        logger.info("Starting chain operation: %s", serialized.get('name', 'Unknown chain'))
     
-    def on_chain_end(self, outputs: Dict[str, Any], **kwargs):
+    async def on_chain_end(self, outputs: Dict[str, Any], **kwargs):
         """Log when a chain completes processing."""
         logger.info("Chain operation completed")
     
-    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs):
+    async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs):
         """Log when a tool starts processing."""
-        logger.info(f"Starting tool operation: {serialized.get('name', 'Unknown tool')}")
+        logger.info("Starting tool operation: %s", serialized.get('name', 'Unknown tool'))
     
-    def on_tool_end(self, output: str, **kwargs):
+    async def on_tool_end(self, output: str, **kwargs):
         """Log when a tool completes processing."""
         logger.info("Tool operation completed")
     
-    def on_agent_action(self, action, **kwargs):
+    async def on_agent_action(self, action, **kwargs):
         """Log when an agent takes an action."""
-        logger.info(f"Agent taking action: {action}")
+        logger.info("Agent taking action: %s", action)
     
-    def on_agent_finish(self, finish, **kwargs):
+    async def on_agent_finish(self, finish, **kwargs):
         """Log when an agent finishes processing."""
-        logger.info("Agent finished processing")
\ No newline at end of file
+        logger.info("Agent finished processing")
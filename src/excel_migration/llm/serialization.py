@@ -0,0 +1,143 @@
+"""Serialization of prompt inputs for LLM calls."""
+import dataclasses
+import json
+import math
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, List
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
+def serialize_for_prompt(value: Any) -> str:
+    """Serialize a value as canonical JSON for embedding in a prompt.
+
+    Keys are sorted so identical inputs always produce identical text, which keeps
+    prompt prefixes and response cache keys stable. Dataclasses are serialized as
+    dicts of their public fields, non-finite floats as null, and other values JSON
+    can't represent with str(). orjson is used when installed; values it rejects
+    (integers wider than 64 bits) and environments without it go through a
+    pure-Python encoder that produces the same text.
+    """
+    if _HAS_ORJSON:
+        try:
+            return orjson.dumps(
+                value,
+                default=_default,
+                option=(
+                    orjson.OPT_SORT_KEYS
+                    | orjson.OPT_NON_STR_KEYS
+                    | orjson.OPT_PASSTHROUGH_DATACLASS
+                )
+            ).decode()
+        except orjson.JSONEncodeError:
+            pass
+    parts: List[str] = []
+    _encode(value, parts)
+    return "".join(parts)
+
+def _default(value: Any) -> Any:
+    """Convert a value neither encoder serializes itself."""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        # Private fields hold derived state, like compiled code, whose text
+        # would differ between processes
+        return {
+            f.name: getattr(value, f.name)
+            for f in dataclasses.fields(value)
+            if not f.name.startswith("_")
+        }
+    return str(value)
+
+def _encode(value: Any, parts: List[str]) -> None:
+    """Append the JSON text of a value, formatted the way orjson formats it.
+
+    Type checks follow orjson: subclasses of str, int, list and dict are encoded
+    natively, other types only when they match exactly.
+    """
+    if value is None:
+        parts.append("null")
+    elif value is True:
+        parts.append("true")
+    elif value is False:
+        parts.append("false")
+    elif isinstance(value, str):
+        parts.append(json.dumps(value, ensure_ascii=False))
+    elif isinstance(value, int):
+        parts.append(int.__repr__(value))
+    elif type(value) is float:
+        parts.append(_format_float(value))
+    elif isinstance(value, dict):
+        items = sorted(((_json_key(key), item) for key, item in value.items()),
+                       key=lambda pair: pair[0])
+        parts.append("{")
+        for i, (key, item) in enumerate(items):
+            if i:
+                parts.append(",")
+            parts.append(json.dumps(key, ensure_ascii=False))
+            parts.append(":")
+            _encode(item, parts)
+        parts.append("}")
+    elif isinstance(value, list) or type(value) is tuple:
+        parts.append("[")
+        for i, item in enumerate(value):
+            if i:
+                parts.append(",")
+            _encode(item, parts)
+        parts.append("]")
+    elif type(value) in (datetime, date, time):
+        parts.append(f'"{value.isoformat()}"')
+    elif isinstance(value, Enum):
+        _encode(value.value, parts)
+    else:
+        _encode(_default(value), parts)
+
+def _json_key(key: Any) -> str:
+    """Convert a dict key to the string orjson uses for it (OPT_NON_STR_KEYS)."""
+    if isinstance(key, str):
+        return key
+    if key is None:
+        return "null"
+    if isinstance(key, bool):
+        return "true" if key else "false"
+    if isinstance(key, int):
+        return int.__repr__(key)
+    if type(key) is float:
+        return _format_float(key)
+    if type(key) in (datetime, date, time):
+        return key.isoformat()
+    if isinstance(key, Enum):
+        return _json_key(key.value)
+    return str(key)
+
+def _format_float(value: float) -> str:
+    """Format a float as orjson does: shortest round-trip digits, null if not finite.
+
+    Values with a decimal exponent up to 16 are written out in full, small ones
+    down to 1e-5 as plain decimals, and the rest in exponent notation without a
+    "+" (1e20, 1.5e-7).
+    """
+    if not math.isfinite(value):
+        return "null"
+    sign, digit_tuple, exponent = Decimal(repr(value)).as_tuple()
+    digits = "".join(map(str, digit_tuple)).rstrip("0")
+    if not digits:
+        return "-0.0" if sign else "0.0"
+    exponent += len(digit_tuple) - len(digits)
+
+    # value = 0.<digits> * 10**point
+    point = len(digits) + exponent
+    if 0 <= exponent and point <= 16:
+        text = digits + "0" * exponent + ".0"
+    elif 0 < point <= 16:
+        text = digits[:point] + "." + digits[point:]
+    elif -5 < point <= 0:
+        text = "0." + "0" * -point + digits
+    elif len(digits) == 1:
+        text = f"{digits}e{point - 1}"
+    else:
+        text = f"{digits[0]}.{digits[1:]}e{point - 1}"
+    return "-" + text if sign else text
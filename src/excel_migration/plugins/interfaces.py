@@ -4,12 +4,15 @@ from typing import Any, Dict, List, Optional, Protocol
 from datetime import datetime
 
 class FormulaExecutor(Protocol):
-    """Protocol for formula execution plugins."""
+    """Protocol for formula execution plugins.
     
-    @property
-    def formula_type(self) -> str:
-        """Get the type of formula this executor handles."""
-        ...
+    ``formula_type`` is a plain class attribute on implementations. They may also
+    define an optional ``prefix`` class attribute naming the formula head they
+    handle, e.g. "SUM(", which lets the registry dispatch to them by lookup;
+    executors without one are matched through ``can_execute``.
+    """
+    
+    formula_type: str  # Type of formula this executor handles
     
     def can_execute(self, formula: str) -> bool:
         """Check if this executor can handle the given formula."""
@@ -20,12 +23,12 @@ class FormulaExecutor(Protocol):
         ...
 
 class TransformationHandler(Protocol):
-    """Protocol for transformation plugins."""
+    """Protocol for transformation plugins.
     
-    @property
-    def transformation_type(self) -> str:
-        """Get the type of transformation this handler processes."""
-        ...
+    ``transformation_type`` is a plain class attribute on implementations.
+    """
+    
+    transformation_type: str  # Type of transformation this handler processes
     
     def can_transform(self, transformation: Dict[str, Any]) -> bool:
         """Check if this handler can process the transformation."""
@@ -42,10 +45,31 @@ class PluginRegistry:
         """Initialize the plugin registry."""
         self._formula_executors: Dict[str, FormulaExecutor] = {}
         self._transformation_handlers: Dict[str, TransformationHandler] = {}
+        # Executors keyed by formula head ("SUM("), plus those without a prefix
+        self._prefix_map: Dict[str, FormulaExecutor] = {}
+        self._unprefixed_executors: Dict[str, FormulaExecutor] = {}
     
     def register_formula_executor(self, executor: FormulaExecutor) -> None:
-        """Register a formula executor."""
+        """Register a formula executor.
+        
+        Executors exposing a ``prefix`` are dispatched by dictionary lookup on the
+        formula head; others are tried in registration order via ``can_execute``.
+        Registering a new executor for a ``formula_type`` replaces the old one,
+        including its dispatch entry.
+        """
+        previous = self._formula_executors.get(executor.formula_type)
+        if previous is not None:
+            previous_prefix = getattr(previous, "prefix", None)
+            if previous_prefix and self._prefix_map.get(previous_prefix) is previous:
+                del self._prefix_map[previous_prefix]
+            self._unprefixed_executors.pop(executor.formula_type, None)
+        
         self._formula_executors[executor.formula_type] = executor
+        prefix = getattr(executor, "prefix", None)
+        if prefix:
+            self._prefix_map[prefix] = executor
+        else:
+            self._unprefixed_executors[executor.formula_type] = executor
     
     def register_transformation_handler(self, handler: TransformationHandler) -> None:
         """Register a transformation handler."""
@@ -53,7 +77,12 @@ class PluginRegistry:
     
     def get_formula_executor(self, formula: str) -> Optional[FormulaExecutor]:
         """Get the appropriate formula executor for a formula."""
-        for executor in self._formula_executors.values():
+        head, paren, _ = formula.partition("(")
+        executor = self._prefix_map.get(head + paren) if paren else None
+        if executor is not None:
+            return executor
+        
+        for executor in self._unprefixed_executors.values():
             if executor.can_execute(formula):
                 return executor
         return None
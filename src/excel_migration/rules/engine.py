@@ -1,20 +1,77 @@
 """Rule generation and execution engine."""
+import asyncio
+import functools
+import re
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import TYPE_CHECKING, ClassVar, Dict, Any, List, Optional, Sequence, Tuple
 import openpyxl
 from loguru import logger
-from langchain_openai import ChatOpenAI
+
+# Strings float() accepts: decimals with optional digit-group underscores and
+# exponent, plus inf/infinity/nan
+_DIGITS = r"\d(?:_?\d)*"
+_NUMERIC_RE = re.compile(
+    rf"[+-]?(?:(?:{_DIGITS}(?:\.(?:{_DIGITS})?)?|\.{_DIGITS})(?:[eE][+-]?{_DIGITS})?"
+    r"|inf|infinity|nan)",
+    re.IGNORECASE
+)
+_DATE_INDICATOR_RE = re.compile(r"[/\-:]|AM|PM")
+_BOOL_VALUES = frozenset({"true", "false", "yes", "no", "0", "1"})
+
+try:
+    from python_calamine import CalamineWorkbook
+    _HAS_CALAMINE = True
+except ImportError:
+    _HAS_CALAMINE = False
+
+def _date_format(field_name: str) -> str:
+    """Infer date format from a lowercased field name."""
+    if any(word in field_name for word in ["time", "timestamp"]):
+        return "%Y-%m-%d %H:%M:%S"
+    return "%Y-%m-%d"
+
+@functools.lru_cache(maxsize=1024)
+def _transformation_spec(source_type: Optional[str],
+                         field_name: str) -> Tuple[str, Tuple[Tuple[str, Any], ...]]:
+    """Return the transformation type and params for a source type and lowercased field name.
+    
+    Params are returned as items so the cached value is immutable; callers build
+    a new dict from them for every rule.
+    """
+    # Add type-specific transformations
+    if source_type == "datetime":
+        return "datetime_format", (("format", _date_format(field_name)),)
+    if source_type == "numeric":
+        return "numeric_format", (
+            ("decimal_places", 2 if "amount" in field_name else 0),
+            ("thousands_separator", True)
+        )
+    return "direct", ()  # Default to direct copy
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
 class RuleEngine:
     """Engine for generating and executing migration rules."""
     
+    # Shared by all engines and created on first use
+    _llm: ClassVar[Optional["ChatOpenAI"]] = None
+    
     def __init__(self, llm_provider: str = "openai"):
         """Initialize the rule engine."""
-        self.llm = ChatOpenAI(
-            model_name="gpt-4",
-            temperature=0.7
-        )
         logger.debug(f"Initialized rule engine with {llm_provider}")
+    
+    @property
+    def llm(self) -> "ChatOpenAI":
+        """Get the language model client, creating it on first access."""
+        cls = type(self)
+        if cls._llm is None:
+            from langchain_openai import ChatOpenAI
+            cls._llm = ChatOpenAI(
+                model_name="gpt-4",
+                temperature=0.7
+            )
+        return cls._llm
 
     async def generate_rules(
         self,
@@ -25,9 +82,11 @@ class RuleEngine:
     ) -> List[Dict[str, Any]]:
         """Generate migration rules by analyzing example files."""
         try:
-            # Analyze source and target structures
-            source_structure = self._analyze_sheet(source_file, source_sheet)
-            target_structure = self._analyze_sheet(target_file, target_sheet)
+            # Analyze source and target structures concurrently in worker threads
+            source_structure, target_structure = await asyncio.gather(
+                asyncio.to_thread(self._analyze_sheet, source_file, source_sheet),
+                asyncio.to_thread(self._analyze_sheet, target_file, target_sheet)
+            )
             
             rules = []
             
@@ -134,16 +193,12 @@ class RuleEngine:
                 rules.extend(transform_rules)
                 rules.extend(calc_rules)
             
-            # Remove duplicates
-            unique_rules = []
-            seen_targets = set()
+            # Remove duplicates, keeping the first rule for each target field
+            unique_rules = {}
             for rule in rules:
-                target = rule["target_field"]
-                if target not in seen_targets:
-                    unique_rules.append(rule)
-                    seen_targets.add(target)
+                unique_rules.setdefault(rule["target_field"], rule)
             
-            return unique_rules
+            return list(unique_rules.values())
             
         except Exception as e:
             logger.error(f"Rule generation failed: {str(e)}")
@@ -152,8 +207,10 @@ class RuleEngine:
     def _analyze_sheet(self, file_path: Path, sheet_name: str) -> Dict[str, Any]:
         """Analyze sheet structure and content."""
         try:
-            wb = openpyxl.load_workbook(file_path, read_only=True)
-            ws = wb[sheet_name]
+            if _HAS_CALAMINE:
+                rows = self._read_sample_calamine(file_path, sheet_name)
+            else:
+                rows = self._read_sample_openpyxl(file_path, sheet_name)
             
             analysis = {
                 "sheet_name": sheet_name,
@@ -163,18 +220,16 @@ class RuleEngine:
             }
             
             # Get headers
-            for cell in ws[1]:
-                if cell.value:
-                    analysis["headers"].append(str(cell.value))
+            header_row = rows[0] if rows else ()
+            analysis["headers"] = [str(value) for value in header_row if value]
+            analysis["header_set"] = set(analysis["headers"])  # for membership checks
             
-            # Analyze data types and get samples
-            for col_idx, header in enumerate(analysis["headers"], 1):
-                col_letter = openpyxl.utils.get_column_letter(col_idx)
-                values = []
-                for row in range(2, min(7, ws.max_row + 1)):  # Sample first 5 data rows
-                    cell = ws[f"{col_letter}{row}"]
-                    if cell.value:
-                        values.append(str(cell.value))
+            # Analyze data types and get samples from the first 5 data rows
+            for col_idx, header in enumerate(analysis["headers"]):
+                values = [
+                    str(row[col_idx]) for row in rows[1:]
+                    if col_idx < len(row) and row[col_idx]
+                ]
                 
                 if values:
                     analysis["data_types"][header] = self._infer_data_type(values)
@@ -183,30 +238,43 @@ class RuleEngine:
                         "samples": values
                     })
             
-            wb.close()
             return analysis
             
         except Exception as e:
             logger.error(f"Sheet analysis failed: {str(e)}")
             raise
 
+    def _read_sample_openpyxl(self, file_path: Path, sheet_name: str) -> List[Sequence[Any]]:
+        """Read the header row plus up to 5 data rows using read_only mode."""
+        wb = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            return list(wb[sheet_name].iter_rows(min_row=1, max_row=6, values_only=True))
+        finally:
+            wb.close()
+
+    def _read_sample_calamine(self, file_path: Path, sheet_name: str) -> List[Sequence[Any]]:
+        """Read the header row plus up to 5 data rows with the calamine parser."""
+        sheet = CalamineWorkbook.from_path(str(file_path)).get_sheet_by_name(sheet_name)
+        
+        # Calamine yields every number as a float; match openpyxl's int for whole numbers
+        return [
+            [int(value) if isinstance(value, float) and value.is_integer() else value
+             for value in row]
+            for row in sheet.to_python(skip_empty_area=False, nrows=6)
+        ]
+
     def _infer_data_type(self, values: List[str]) -> str:
         """Infer data type from sample values."""
-        try:
-            # Try numeric
-            float(values[0])
+        # Check numeric
+        if _NUMERIC_RE.fullmatch(values[0].strip()):
             return "numeric"
-        except ValueError:
-            pass
         
         # Check date format
-        date_indicators = ["/", "-", ":", "AM", "PM"]
-        if any(ind in values[0] for ind in date_indicators):
+        if _DATE_INDICATOR_RE.search(values[0]):
             return "datetime"
         
         # Check boolean
-        bool_values = ["true", "false", "yes", "no", "0", "1"]
-        if all(v.lower() in bool_values for v in values):
+        if all(v.lower() in _BOOL_VALUES for v in values):
             return "boolean"
         
         return "text"
@@ -221,7 +289,7 @@ class RuleEngine:
         
         # Direct matches
         for target_field in target["headers"]:
-            if target_field in source["headers"]:
+            if target_field in source["header_set"]:
                 rules.append({
                     "type": "field_mapping",
                     "source_field": target_field,
@@ -243,7 +311,7 @@ class RuleEngine:
         rules = []
         
         # Name transformations
-        if "FullName" in target["headers"] and "FirstName" in source["headers"] and "LastName" in source["headers"]:
+        if "FullName" in target["header_set"] and "FirstName" in source["header_set"] and "LastName" in source["header_set"]:
             rules.append({
                 "type": "field_mapping",
                 "source_field": ["FirstName", "LastName"],
@@ -257,7 +325,7 @@ class RuleEngine:
             })
         
         # Status transformations
-        if "IsActive" in target["headers"] and "Status" in source["headers"]:
+        if "IsActive" in target["header_set"] and "Status" in source["header_set"]:
             rules.append({
                 "type": "field_mapping",
                 "source_field": "Status",
@@ -282,7 +350,7 @@ class RuleEngine:
         rules = []
         
         # Days since registration
-        if "DaysSinceRegistration" in target["headers"] and "RegistrationDate" in source["headers"]:
+        if "DaysSinceRegistration" in target["header_set"] and "RegistrationDate" in source["header_set"]:
             rules.append({
                 "type": "calculation",
                 "target_field": "DaysSinceRegistration",
@@ -292,7 +360,7 @@ class RuleEngine:
             })
         
         # Transaction count
-        if "TransactionCount" in target["headers"] and "TransactionID" in source["headers"]:
+        if "TransactionCount" in target["header_set"] and "TransactionID" in source["header_set"]:
             rules.append({
                 "type": "calculation",
                 "target_field": "TransactionCount",
@@ -302,7 +370,7 @@ class RuleEngine:
             })
         
         # Total spent
-        if "TotalSpent" in target["headers"] and "Amount" in source["headers"]:
+        if "TotalSpent" in target["header_set"] and "Amount" in source["header_set"]:
             rules.append({
                 "type": "calculation",
                 "target_field": "TotalSpent",
@@ -312,7 +380,7 @@ class RuleEngine:
             })
         
         # Average amount
-        if "AverageAmount" in target["headers"] and "Amount" in source["headers"]:
+        if "AverageAmount" in target["header_set"] and "Amount" in source["header_set"]:
             rules.append({
                 "type": "calculation",
                 "target_field": "AverageAmount",
@@ -322,7 +390,7 @@ class RuleEngine:
             })
         
         # Success rate
-        if "SuccessRate" in target["headers"] and "Status" in source["headers"]:
+        if "SuccessRate" in target["header_set"] and "Status" in source["header_set"]:
             rules.append({
                 "type": "calculation",
                 "target_field": "SuccessRate",
@@ -335,32 +403,9 @@ class RuleEngine:
 
     def _get_transformation_rule(self, source_type: str, target_field: str) -> Dict[str, Any]:
         """Get appropriate transformation rule based on field types."""
-        transformation = {
-            "type": "direct",  # Default to direct copy
-            "params": {}
-        }
-        
-        # Add type-specific transformations
-        if source_type == "datetime":
-            transformation.update({
-                "type": "datetime_format",
-                "params": {
-                    "format": self._infer_date_format(target_field)
-                }
-            })
-        elif source_type == "numeric":
-            transformation.update({
-                "type": "numeric_format",
-                "params": {
-                    "decimal_places": 2 if "amount" in target_field.lower() else 0,
-                    "thousands_separator": True
-                }
-            })
-        
-        return transformation
+        trans_type, params = _transformation_spec(source_type, target_field.lower())
+        return {"type": trans_type, "params": dict(params)}
 
     def _infer_date_format(self, field_name: str) -> str:
         """Infer date format based on field name."""
-        if any(word in field_name.lower() for word in ["time", "timestamp"]):
-            return "%Y-%m-%d %H:%M:%S"
-        return "%Y-%m-%d"
\ No newline at end of file
+        return _date_format(field_name.lower())
@@ -1,6 +1,12 @@
 """Rule execution engine."""
-from typing import Dict, Any, List, Union
+import ast
+import functools
+import keyword
+import re
+from types import CodeType
+from typing import Dict, Any, List, Tuple, Union
 from loguru import logger
+from ..core.expressions import EXPRESSION_GLOBALS, compile_expression
 from ..core.interfaces import RuleExecutor as RuleExecutorInterface
 from ..plugins.interfaces import PluginRegistry, FormulaExecutor, TransformationHandler
 from ..plugins.base import (
@@ -15,6 +21,44 @@ from ..plugins.base import (
     ConcatenateTransformer
 )
 
+_FIELD_REF_RE = re.compile(r"\[([^\]]+)\]")
+
+def _is_plain_name(field: str) -> bool:
+    """Check if a field can be used as a local name in a formula as-is."""
+    return (field.isidentifier() and not keyword.iskeyword(field)
+            and not field.startswith("_") and field not in EXPRESSION_GLOBALS)
+
+@functools.lru_cache(maxsize=1024)
+def _compile_formula(formula: str) -> Tuple[CodeType, Tuple[Tuple[str, str], ...]]:
+    """Compile an arithmetic formula once into a code object.
+    
+    Field references like ``[Amount]`` become local names, so the formula is parsed
+    once and evaluated per row against that row's values. Fields that are valid
+    identifiers keep their own name. The result is checked against the same
+    whitelist as rule transformations (core.expressions).
+    
+    Returns the code object and the (field, local name) pairs it reads.
+    """
+    fields: Dict[str, str] = {}
+    
+    def to_name(match: re.Match) -> str:
+        field = match.group(1)
+        if field not in fields:
+            fields[field] = field if _is_plain_name(field) else f"_f{len(fields)}"
+        return fields[field]
+    
+    code = compile_expression(_FIELD_REF_RE.sub(to_name, formula), f"<formula:{formula}>")
+    return code, tuple(fields.items())
+
+def _formula_value(value: Any) -> Any:
+    """Convert a field value to the literal it would read as inside the formula."""
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return ast.literal_eval(str(value))
+    except (ValueError, SyntaxError):
+        raise ValueError(f"Value {value!r} cannot be used in an arithmetic formula")
+
 class RuleExecutor(RuleExecutorInterface):
     """Execute migration rules on Excel files."""
     
@@ -22,6 +66,15 @@ class RuleExecutor(RuleExecutorInterface):
         """Initialize the rule executor."""
         self.registry = PluginRegistry()
         self._register_default_plugins()
+        # Rule type -> validation and execution methods
+        self._validators = {
+            "field_mapping": self._validate_field_mapping,
+            "calculation": self._validate_calculation
+        }
+        self._handlers = {
+            "field_mapping": self._execute_field_mapping,
+            "calculation": self._execute_calculation
+        }
         logger.debug("Initialized rule executor with default plugins")
     
     def _register_default_plugins(self):
@@ -49,6 +102,10 @@ class RuleExecutor(RuleExecutorInterface):
     
     async def validate_rule(self, rule: Dict[str, Any]) -> bool:
         """Validate a rule's structure and requirements."""
+        return self._validate_rule_sync(rule)
+    
+    def _validate_rule_sync(self, rule: Dict[str, Any]) -> bool:
+        """Validate a rule without going through a coroutine."""
         if not isinstance(rule, dict):
             logger.error("Rule must be a dictionary")
             return False
@@ -58,43 +115,44 @@ class RuleExecutor(RuleExecutorInterface):
             logger.error("Rule type not specified")
             return False
         
-        if rule_type == "field_mapping":
-            return self._validate_field_mapping(rule)
-        elif rule_type == "calculation":
-            return self._validate_calculation(rule)
-        else:
+        validator = self._validators.get(rule_type) if isinstance(rule_type, str) else None
+        if validator is None:
             logger.error(f"Unknown rule type: {rule_type}")
             return False
+        return validator(rule)
     
     def _validate_field_mapping(self, rule: Dict[str, Any]) -> bool:
         """Validate a field mapping rule."""
-        required_fields = ["source_field", "target_field"]
-        return all(field in rule for field in required_fields)
+        return "source_field" in rule and "target_field" in rule
     
     def _validate_calculation(self, rule: Dict[str, Any]) -> bool:
         """Validate a calculation rule."""
-        required_fields = ["target_field", "formula"]
-        return all(field in rule for field in required_fields)
+        return "target_field" in rule and "formula" in rule
     
     async def execute(self, rule: Dict[str, Any], context: Dict[str, Any]) -> bool:
         """Execute a single rule."""
+        return self._execute_sync(rule, context)
+    
+    def _execute_sync(self, rule: Dict[str, Any], context: Dict[str, Any]) -> bool:
+        """Execute a single rule without going through a coroutine.
+        
+        Rule execution is CPU-only; the async methods are kept for the
+        RuleExecutor interface and wrap these.
+        """
         try:
-            if not await self.validate_rule(rule):
+            if not self._validate_rule_sync(rule):
                 return False
             
-            rule_type = rule["type"]
-            if rule_type == "field_mapping":
-                return await self._execute_field_mapping(rule, context)
-            elif rule_type == "calculation":
-                return await self._execute_calculation(rule, context)
-            
-            return False
+            handler = self._handlers.get(rule["type"])
+            if handler is None:
+                return False
+            return handler(rule, context)
             
         except Exception as e:
             logger.error(f"Rule execution failed: {str(e)}")
             return False
     
-    async def _execute_field_mapping(self, rule: Dict[str, Any], context: Dict[str, Any]) -> bool:
+    def _execute_field_mapping(self, rule: Dict[str, Any], context: Dict[str, Any]) -> bool:
         """Execute a field mapping rule."""
         try:
             source_field = rule["source_field"]
@@ -129,7 +187,7 @@ class RuleExecutor(RuleExecutorInterface):
             logger.error(f"Field mapping failed: {str(e)}")
             return False
     
-    async def _execute_calculation(self, rule: Dict[str, Any], context: Dict[str, Any]) -> bool:
+    def _execute_calculation(self, rule: Dict[str, Any], context: Dict[str, Any]) -> bool:
         """Execute a calculation rule."""
         try:
             target_field = rule["target_field"]
@@ -186,14 +244,22 @@ class RuleExecutor(RuleExecutorInterface):
             if executor:
                 return executor.execute(formula, values)
             
-            # For simple arithmetic formulas, replace field references with values
-            for field, value in values.items():
-                formula = formula.replace(f"[{field}]", str(value))
+            # Simple arithmetic formulas are compiled once and evaluated with
+            # the field references bound to this row's values
+            code, names = _compile_formula(formula)
+            
+            # Numeric values under their own names are read from the row's
+            # values directly; anything else is bound into a new mapping
+            if all(field == name and type(values.get(field)) in (int, float)
+                   for field, name in names):
+                return eval(code, EXPRESSION_GLOBALS, values)
             
-            # Evaluate the formula
-            # Note: In a production environment, you would want to use a safer
-            # evaluation method or a proper expression parser
-            return eval(formula)
+            local_values = {
+                name: _formula_value(values[field])
+                for field, name in names
+                if field in values
+            }
+            return eval(code, EXPRESSION_GLOBALS, local_values)
             
         except Exception as e:
             logger.error(f"Formula execution failed: {str(e)}")
@@ -1,4 +1,5 @@
 """Base task implementations for Excel migration framework."""
+import asyncio
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Set
@@ -11,6 +12,9 @@ from ..core.interfaces import (
     SheetAnalyzer, DataExtractor, ImageProcessor
 )
 
+# Task context entries that are not sent to the LLM with the task context
+_PROMPT_EXCLUDED_KEYS = frozenset({"sheet_analyses", "rule_executor"})
+
 @dataclass
 class SheetMapping:
     """Mapping between source and target sheets."""
@@ -184,9 +188,14 @@ class TaskBasedProcessor(TaskProcessor):
     """Process tasks with rule generation and multimodal analysis."""
     
     def __init__(self, 
-                 rule_generator: RuleGenerator,
-                 sheet_analyzer: SheetAnalyzer,
+                 rule_generator: Optional[RuleGenerator],
+                 sheet_analyzer: Optional[SheetAnalyzer],
                  llm_provider: Any):
+        """Initialize the processor.
+        
+        The rule generator, analyzer and LLM provider may be None when rules are
+        preloaded (e.g. from a rules file); generation and insights are then skipped.
+        """
         self.rule_generator = rule_generator
         self.sheet_analyzer = sheet_analyzer
         self.llm_provider = llm_provider
@@ -196,7 +205,7 @@ class TaskBasedProcessor(TaskProcessor):
         """Process a task."""
         try:
             # Generate rules if example files are provided
-            if task.example_source and task.example_target:
+            if self.rule_generator and task.example_source and task.example_target:
                 await self._generate_rules_from_examples(task)
             
             # Process each sheet mapping
@@ -214,8 +223,14 @@ class TaskBasedProcessor(TaskProcessor):
     async def process_sheet(self, task: Task, mapping: SheetMapping) -> bool:
         """Process a single sheet mapping."""
         try:
-            # Load source data
-            source_rows = self._load_sheet_data(task.source_file, mapping.source_sheet)
+            # Load source data (blocking workbook I/O runs off the event loop)
+            source_rows = await asyncio.to_thread(
+                self._load_sheet_data, task.source_file, mapping.source_sheet
+            )
+            
+            # Analysis and insights describe one sheet, so they start fresh for each
+            task.context.pop("sheet_analysis", None)
+            task.context.pop("sheet_insights", None)
             
             # Process each row
             for source_data in source_rows:
@@ -245,18 +260,24 @@ class TaskBasedProcessor(TaskProcessor):
                     })
                 
                 # Analyze source sheet (only once per sheet)
-                if "sheet_analysis" not in task.context:
-                    analysis = await self.sheet_analyzer.analyze_sheet(
-                        task.source_file,
-                        mapping.source_sheet
-                    )
+                if self.sheet_analyzer and "sheet_analysis" not in task.context:
+                    analysis = task.context.get("sheet_analyses", {}).get(mapping.source_sheet)
+                    if analysis is None:
+                        analysis = await self.sheet_analyzer.analyze_sheet(
+                            task.source_file,
+                            mapping.source_sheet
+                        )
                     task.context["sheet_analysis"] = analysis
                 
                 # Get insights from LLM (only once per sheet)
-                if "sheet_insights" not in task.context:
+                if self.llm_provider and "sheet_insights" not in task.context:
+                    prompt_context = {
+                        key: value for key, value in task.context.items()
+                        if key not in _PROMPT_EXCLUDED_KEYS
+                    }
                     insights = await self.llm_provider.analyze_task({
-                        **task.context,
-                        "sheet_analysis": task.context["sheet_analysis"],
+                        **prompt_context,
+                        "sheet_analysis": task.context.get("sheet_analysis"),
                         "mapping": mapping
                     })
                     task.context["sheet_insights"] = insights
@@ -270,7 +291,8 @@ class TaskBasedProcessor(TaskProcessor):
                 
                 # Save target data if in migration mode
                 if task.task_type == "migrate" and task.context["target_data"]:
-                    self._save_sheet_data(
+                    await asyncio.to_thread(
+                        self._save_sheet_data,
                         task.target_file,
                         mapping.target_sheet,
                         task.context["target_data"]
@@ -0,0 +1,39 @@
+"""Tests for the SUM and AVERAGE formula executors."""
+import math
+import random
+
+import pytest
+
+from excel_migration.plugins import base
+from excel_migration.plugins.base import AverageExecutor, SumExecutor
+
+@pytest.fixture(params=["numpy", "python"], autouse=True)
+def reduction(request, monkeypatch):
+    """Run each test with the NumPy reduction and with the plain Python one."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+        assert base._HAS_NUMPY
+    else:
+        monkeypatch.setattr(base, "_HAS_NUMPY", False)
+    return request.param
+
+def _values(count: int):
+    rng = random.Random(count)
+    return [rng.uniform(-1e6, 1e6) for _ in range(count)]
+
+@pytest.mark.parametrize("count", [10, 64, 10_000])
+def test_sum_is_within_tolerance_of_exact_sum(count):
+    values = _values(count)
+    result = SumExecutor().execute("SUM([Amount])", {"Amount": values + [None]})
+    assert result == pytest.approx(math.fsum(values), rel=1e-12, abs=1e-6)
+
+@pytest.mark.parametrize("count", [10, 64, 10_000])
+def test_average_is_within_tolerance_of_exact_average(count):
+    values = _values(count)
+    result = AverageExecutor().execute("AVERAGE([Amount])", {"Amount": [None] + values})
+    assert result == pytest.approx(math.fsum(values) / count, rel=1e-12, abs=1e-9)
+
+def test_numeric_strings_are_summed():
+    values = [str(i) for i in range(100)]
+    assert SumExecutor().execute("SUM([Amount])", {"Amount": values}) == 4950.0
+    assert AverageExecutor().execute("AVERAGE([Amount])", {"Amount": values}) == 49.5
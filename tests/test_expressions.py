@@ -0,0 +1,49 @@
+"""Tests for the restricted expression compiler."""
+import pytest
+
+from excel_migration.core.expressions import EXPRESSION_GLOBALS, compile_expression
+from excel_migration.core.models import MigrationRule, RuleType
+from excel_migration.rules.executor import RuleExecutor
+
+@pytest.mark.parametrize("source, values, expected", [
+    ("A * 2 + B", {"A": 3, "B": 1}, 7),
+    ("sum([A, B]) / len([A, B])", {"A": 2, "B": 4}, 3),
+    ("round(float(A), 1) if float(A) > 0 else 0", {"A": "1.25"}, 1.2),
+    ("A[0] + A[-1]", {"A": [1, 2, 3]}, 4),
+    ("avg([A, B, C])", {"A": 1, "B": None, "C": 3}, 2),
+    ("count([A, B, C])", {"A": 1, "B": None, "C": 3}, 2),
+])
+def test_allowed_expressions(source, values, expected):
+    code = compile_expression(source, "<test>")
+    assert eval(code, EXPRESSION_GLOBALS, values) == expected
+
+@pytest.mark.parametrize("source", [
+    "().__class__.__base__.__subclasses__()",
+    "A.upper()",
+    "__import__('os')",
+    "__builtins__",
+    "A['__class__']",
+    "(lambda: 1)()",
+    "[x for x in A]",
+    "sum(x for x in A)",
+    "open('/etc/passwd')",
+    "max(**A)",
+    "(y := 1)",
+])
+def test_rejected_expressions(source):
+    with pytest.raises(ValueError):
+        compile_expression(source, "<test>")
+
+def test_rule_outside_whitelist_is_not_compiled():
+    rule = MigrationRule(
+        rule_type=RuleType.COMPUTE,
+        source_columns=["A"],
+        target_column="B",
+        transformation="().__class__.__base__.__subclasses__()"
+    )
+    assert rule._compiled is None
+
+def test_formulas_share_the_whitelist():
+    executor = RuleExecutor()
+    assert executor._execute_formula("[Amount] * 2", {"Amount": 3}) == 6
+    assert executor._execute_formula("[Amount].__class__", {"Amount": 3}) is None
@@ -0,0 +1,61 @@
+"""Tests for formula executor dispatch in the plugin registry."""
+from typing import Any, Dict, Optional
+
+from excel_migration.plugins.base import SumExecutor
+from excel_migration.plugins.interfaces import PluginRegistry
+
+class _Executor:
+    """Minimal formula executor for dispatch tests."""
+    
+    def __init__(self, formula_type: str, prefix: Optional[str] = None):
+        self.formula_type = formula_type
+        if prefix is not None:
+            self.prefix = prefix
+    
+    def can_execute(self, formula: str) -> bool:
+        """Match formulas named after the formula type."""
+        return formula.startswith(f"{self.formula_type.upper()}(")
+    
+    def execute(self, formula: str, values: Dict[str, Any]) -> Any:
+        """Return the executor itself, so tests can see which one ran."""
+        return self
+
+def test_dispatch_by_prefix_and_fallback():
+    registry = PluginRegistry()
+    sum_executor = SumExecutor()
+    custom = _Executor("custom")
+    registry.register_formula_executor(sum_executor)
+    registry.register_formula_executor(custom)
+    
+    assert registry.get_formula_executor("SUM([Amount])") is sum_executor
+    assert registry.get_formula_executor("CUSTOM([Amount])") is custom
+    assert registry.get_formula_executor("UNKNOWN([Amount])") is None
+
+def test_reregistering_with_another_prefix_replaces_the_old_entry():
+    registry = PluginRegistry()
+    old = _Executor("total", prefix="TOTAL(")
+    new = _Executor("total", prefix="TOTALS(")
+    registry.register_formula_executor(old)
+    registry.register_formula_executor(new)
+    
+    assert registry.get_formula_executor("TOTAL([Amount])") is None
+    assert registry.get_formula_executor("TOTALS([Amount])") is new
+
+def test_reregistering_without_a_prefix_replaces_the_old_entry():
+    registry = PluginRegistry()
+    old = _Executor("total", prefix="TOTAL(")
+    new = _Executor("total")
+    registry.register_formula_executor(old)
+    registry.register_formula_executor(new)
+    
+    assert registry.get_formula_executor("TOTAL([Amount])") is new
+
+def test_reregistering_with_a_prefix_replaces_the_fallback_entry():
+    registry = PluginRegistry()
+    old = _Executor("total")
+    new = _Executor("total", prefix="SUMMED(")
+    registry.register_formula_executor(old)
+    registry.register_formula_executor(new)
+    
+    assert registry.get_formula_executor("TOTAL([Amount])") is None
+    assert registry.get_formula_executor("SUMMED([Amount])") is new
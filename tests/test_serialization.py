@@ -0,0 +1,77 @@
+"""Tests for prompt serialization."""
+import math
+from datetime import date, datetime, timezone
+from enum import Enum
+from pathlib import Path
+
+import pytest
+
+from excel_migration.core.models import MigrationRule, RuleType
+from excel_migration.llm import serialization
+from excel_migration.llm.serialization import serialize_for_prompt
+
+class Color(Enum):
+    RED = "red"
+
+@pytest.fixture(params=["orjson", "stdlib"], autouse=True)
+def encoder(request, monkeypatch):
+    """Run each test with orjson and with the pure-Python encoder."""
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serialization, "_HAS_ORJSON", False)
+    return request.param
+
+def test_keys_are_sorted_and_stringified():
+    value = {"b": 1, "a": [1, 2.5, None, True], 2: "x", None: 3, True: 4}
+    assert serialize_for_prompt(value) == (
+        '{"2":"x","a":[1,2.5,null,true],"b":1,"null":3,"true":4}'
+    )
+
+def test_non_finite_floats_are_null():
+    assert serialize_for_prompt([math.nan, math.inf, -math.inf]) == "[null,null,null]"
+
+def test_wide_integers_are_kept():
+    assert serialize_for_prompt({"n": 2**70, "m": -2**70}) == (
+        '{"m":-1180591620717411303424,"n":1180591620717411303424}'
+    )
+
+@pytest.mark.parametrize("value, expected", [
+    (1e20, "1e20"),
+    (1e16, "1e16"),
+    (1e15, "1000000000000000.0"),
+    (1e-5, "0.00001"),
+    (1.5e-7, "1.5e-7"),
+    (-0.0, "-0.0"),
+    (123.456, "123.456"),
+])
+def test_float_formatting(value, expected):
+    assert serialize_for_prompt(value) == expected
+
+def test_dataclass_private_fields_are_excluded():
+    rule = MigrationRule(
+        rule_type=RuleType.COMPUTE,
+        source_columns=["A"],
+        target_column="B",
+        transformation="A * 2"
+    )
+    assert rule._compiled is not None
+    assert serialize_for_prompt(rule) == (
+        '{"conditions":null,"llm_prompt":null,"preserve_style":false,'
+        '"rule_type":"compute","source_columns":["A"],"target_column":"B",'
+        '"transformation":"A * 2"}'
+    )
+
+def test_other_values():
+    value = {
+        "when": datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc),
+        "day": date(2024, 1, 1),
+        Color.RED: Color.RED,
+        "path": Path("a/b"),
+        "text": "héllo \"quoted\"\n",
+        "pair": (1, 2)
+    }
+    assert serialize_for_prompt(value) == (
+        '{"day":"2024-01-01","pair":[1,2],"path":"a/b","red":"red",'
+        '"text":"héllo \\"quoted\\"\\n","when":"2024-01-02T03:04:05.000006+00:00"}'
+    )